@@ -0,0 +1,55 @@
+import battery_param_pipeline as bpp
+import numpy as np
+
+
+def _parameter_values(n):
+    rng = np.random.default_rng(0)
+    return {
+        "Electrode area [m2]": rng.uniform(0.1, 0.2, n),
+        "Negative electrode thickness [m]": rng.uniform(50e-6, 100e-6, n),
+        "Positive electrode thickness [m]": rng.uniform(50e-6, 100e-6, n),
+        "Maximum concentration in negative electrode [mol.m-3]": 30000,
+        "Maximum concentration in positive electrode [mol.m-3]": 50000,
+        "Negative electrode loading [A.h.cm-2]": rng.uniform(3e-4, 4e-4, n),
+        "Positive electrode loading [A.h.cm-2]": rng.uniform(3e-4, 4e-4, n),
+        "Negative particle radius [m]": 5e-6,
+        "Positive particle radius [m]": 3e-6,
+        "Maximum stoichiometry in negative electrode": 0.8,
+        "Minimum stoichiometry in negative electrode": 0.01,
+        "Minimum stoichiometry in positive electrode": 0.05,
+        "Maximum stoichiometry in positive electrode": 0.9,
+        "Initial SOC": rng.uniform(0, 1, n),
+    }
+
+
+class Calculations:
+    """Built-in calculations, on batches of increasing size."""
+
+    params = (
+        [
+            "AreaToSquareWidthHeight",
+            "ElectrodeVolumeFractionFromLoading",
+            "SurfaceArea",
+            "InitialSOC",
+        ],
+        [1, 1000, 100000],
+    )
+    param_names = ["calculation", "batch size"]
+
+    def setup(self, calculation, n):
+        self.parameter_values = _parameter_values(n)
+        for previous in [
+            bpp.calculations.AreaToSquareWidthHeight(),
+            bpp.calculations.ElectrodeVolumeFractionFromLoading(),
+        ]:
+            self.parameter_values.update(
+                previous.run(bpp.pipeline._ReadOnlyDict(self.parameter_values))
+            )
+        self.parameter_values = bpp.pipeline._ReadOnlyDict(self.parameter_values)
+        self.calculation = getattr(bpp.calculations, calculation)()
+
+    def time_run(self, calculation, n):
+        self.calculation.run(self.parameter_values)
+
+    def peakmem_run(self, calculation, n):
+        self.calculation.run(self.parameter_values)
@@ -0,0 +1,52 @@
+import battery_param_pipeline as bpp
+import numpy as np
+import os
+import tempfile
+
+
+def write_synthetic_aem_csv(filename, n_rows, n_temperatures=20):
+    """
+    Write an Advanced Electrolyte Model export with `n_rows` rows of made-up data,
+    including columns that the pipeline does not use.
+    """
+    rng = np.random.default_rng(0)
+    n_concentrations = max(n_rows // n_temperatures, 2)
+    T = np.repeat(np.linspace(-20, 60, n_temperatures), n_concentrations)[:n_rows]
+    c = np.tile(np.linspace(0.05, 3, n_concentrations), n_temperatures)[:n_rows]
+    columns = {
+        "Temperature(C)": T,
+        "c": c,
+        "Cond (mS) 2": 10 * c * np.exp(-c) * (1 + T / 100),
+        "t+(a)": 0.4 - 0.05 * c,
+        "Diff. Coeff. cm^2/s": 3e-6 * np.exp(-0.5 * c) * (1 + T / 200),
+    }
+    for i in range(10):
+        columns[f"Unused column {i}"] = rng.random(len(T))
+    with open(filename, "w") as f:
+        f.write(",".join(columns) + "\n")
+        np.savetxt(f, np.column_stack(list(columns.values())), delimiter=",")
+
+
+class AdvancedElectrolyteModel:
+    params = [1000, 10000, 100000]
+    param_names = ["rows"]
+    timeout = 300
+
+    def setup(self, n_rows):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, "aem.csv")
+        write_synthetic_aem_csv(self.filename, n_rows)
+        self.cache = os.path.join(self.tmp_dir.name, "cache")
+        bpp.direct_entries.advanced_electrolyte_model(self.filename, cache=self.cache)
+
+    def teardown(self, n_rows):
+        self.tmp_dir.cleanup()
+
+    def time_advanced_electrolyte_model(self, n_rows):
+        bpp.direct_entries.advanced_electrolyte_model(self.filename)
+
+    def peakmem_advanced_electrolyte_model(self, n_rows):
+        bpp.direct_entries.advanced_electrolyte_model(self.filename)
+
+    def time_advanced_electrolyte_model_cached(self, n_rows):
+        bpp.direct_entries.advanced_electrolyte_model(self.filename, cache=self.cache)
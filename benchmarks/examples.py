@@ -0,0 +1,43 @@
+import importlib
+import os
+import sys
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+
+def _load_example(name):
+    # The example scripts import their own helper modules (e.g. calendar_aging)
+    # by name, so run them from their own directory
+    example_dir = os.path.join(EXAMPLES_DIR, name)
+    sys.path.insert(0, example_dir)
+    try:
+        sys.modules.pop("parameters", None)
+        return importlib.import_module("parameters")
+    finally:
+        sys.path.remove(example_dir)
+
+
+class LGMJ1:
+    timeout = 300
+
+    def setup(self):
+        self.example = _load_example("LGMJ1")
+
+    def time_run(self):
+        self.example.create_pipeline().run()
+
+    def peakmem_run(self):
+        self.example.create_pipeline().run()
+
+
+class Schimpe2018:
+    timeout = 300
+
+    def setup(self):
+        self.example = _load_example("schimpe2018")
+
+    def time_run(self):
+        self.example.create_pipeline().run()
+
+    def peakmem_run(self):
+        self.example.create_pipeline().run()
@@ -0,0 +1,48 @@
+import battery_param_pipeline as bpp
+import concurrent.futures
+
+
+class _Increment(bpp.calculations.Calculation):
+    def __init__(self, i):
+        super().__init__("Increment a parameter")
+        self.i = i
+
+    def run(self, parameter_values):
+        return {f"y{self.i}": parameter_values[f"x{self.i}"] + 1}
+
+
+def synthetic_pipeline(n_components):
+    """
+    Pipeline with `n_components` direct entries, each followed by a calculation
+    that depends on it.
+    """
+    named_components = []
+    for i in range(n_components // 2):
+        named_components += [
+            (f"x{i}", bpp.direct_entries.DirectEntry({f"x{i}": float(i)}, "x")),
+            (f"y{i}", _Increment(i)),
+        ]
+    return bpp.Pipeline(named_components)
+
+
+class SyntheticPipeline:
+    params = [10, 100, 500]
+    param_names = ["components"]
+
+    def setup(self, n_components):
+        self.pipeline = synthetic_pipeline(n_components)
+        # record the keys of the calculations, so that they can be scheduled
+        self.pipeline.run()
+
+    def time_run(self, n_components):
+        self.pipeline.run()
+
+    def time_run_threads(self, n_components):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            self.pipeline.run(executor=executor)
+
+    def time_run_lazy_one_key(self, n_components):
+        self.pipeline.run_lazy()["y0"]
+
+    def peakmem_run(self, n_components):
+        self.pipeline.run()
@@ -139,7 +139,7 @@ class ElectrodeSOH(bpp.calculations.Calculation):
 
     def run(self, parameter_values):
         param = pybamm.LithiumIonParameters()
-        parameter_values = pybamm.ParameterValues(dict(parameter_values))
+        parameter_values = parameter_values.to_pybamm()
         T = parameter_values.evaluate(param.T_ref)
 
         x_0, x_100, y_100, y_0 = pybamm.lithium_ion.get_min_max_stoichiometries(
@@ -163,37 +163,42 @@ class ElectrodeSOH(bpp.calculations.Calculation):
         return esoh_parameter_values
 
 
-output_dir = os.path.dirname(__file__)
-pipeline = bpp.Pipeline(
-    [
-        ("defaults", bpp.direct_entries.standard_defaults()),
-        ("temperatures", bpp.direct_entries.temperatures(298.15)),
-        ("Sturm2018", sturm2018()),
-        ("electrode SOH calculations", ElectrodeSOH()),
-    ],
-    cache=output_dir,
-)
-parameter_values = pipeline.run()
-
-# pybamm.set_logging_level("INFO")
-# # load models
-# models = [
-#     pybamm.lithium_ion.SPM(),
-#     pybamm.lithium_ion.SPMe(),
-#     pybamm.lithium_ion.DFN(),
-# ]
-
-# # create and run simulations
-# sims = []
-# parameter_values["Current function [A]"] = (
-#     parameter_values["Nominal cell capacity [A.h]"] / 5
-# )
-# for model in models:
-#     sim = pybamm.Simulation(model, parameter_values=parameter_values)
-#     sim.solve(np.linspace(0, 3600 * 5, 1000))
-#     sims.append(sim)
-
-# # plot
-# pybamm.dynamic_plot(sims, ["Terminal voltage [V]"])
-bpp.plots.open_circuit(parameter_values)
-plt.show()
+def create_pipeline(output_dir=None):
+    return bpp.Pipeline(
+        [
+            ("defaults", bpp.direct_entries.standard_defaults()),
+            ("temperatures", bpp.direct_entries.temperatures(298.15)),
+            ("Sturm2018", sturm2018()),
+            ("electrode SOH calculations", ElectrodeSOH()),
+        ],
+        cache=output_dir,
+    )
+
+
+if __name__ == "__main__":
+    output_dir = os.path.dirname(__file__)
+    pipeline = create_pipeline(output_dir)
+    parameter_values = pipeline.run()
+
+    # pybamm.set_logging_level("INFO")
+    # # load models
+    # models = [
+    #     pybamm.lithium_ion.SPM(),
+    #     pybamm.lithium_ion.SPMe(),
+    #     pybamm.lithium_ion.DFN(),
+    # ]
+
+    # # create and run simulations
+    # sims = []
+    # parameter_values["Current function [A]"] = (
+    #     parameter_values["Nominal cell capacity [A.h]"] / 5
+    # )
+    # for model in models:
+    #     sim = pybamm.Simulation(model, parameter_values=parameter_values)
+    #     sim.solve(np.linspace(0, 3600 * 5, 1000))
+    #     sims.append(sim)
+
+    # # plot
+    # pybamm.dynamic_plot(sims, ["Terminal voltage [V]"])
+    bpp.plots.open_circuit(parameter_values)
+    plt.show()
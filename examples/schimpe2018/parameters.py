@@ -3,7 +3,6 @@ import battery_param_pipeline as bpp
 import os
 import matplotlib.pyplot as plt
 import numpy as np
-import scipy
 from calendar_aging import CalendarAgeing
 
 
@@ -102,8 +101,12 @@ class CapacityCalculation(bpp.calculations.Calculation):
         x_0 = parameter_values["Minimum stoichiometry in negative electrode"]
         y_100 = parameter_values["Minimum stoichiometry in positive electrode"]
         y_0 = parameter_values["Maximum stoichiometry in positive electrode"]
-        U_n = parameter_values["Negative electrode OCP [V]"]
-        U_p = parameter_values["Positive electrode OCP [V]"]
+        U_n = bpp.functions.compile_function(
+            parameter_values["Negative electrode OCP [V]"]
+        )
+        U_p = bpp.functions.compile_function(
+            parameter_values["Positive electrode OCP [V]"]
+        )
         Q_n = capacity_parameter_values["Negative electrode capacity [A.h]"]
         Q_p = capacity_parameter_values["Positive electrode capacity [A.h]"]
         Q_cell_n = capacity_parameter_values[
@@ -113,8 +116,8 @@ class CapacityCalculation(bpp.calculations.Calculation):
             "Cell capacity from positive electrode [A.h]"
         ]
 
-        V_max = (U_p(y_100) - U_n(x_100)).evaluate()
-        V_min = (U_p(y_0) - U_n(x_0)).evaluate()
+        V_max = U_p(y_100) - U_n(x_100)
+        V_min = U_p(y_0) - U_n(x_0)
         Q_Li = Q_n * x_100 + Q_p * y_100
         Q_cell = (Q_cell_n + Q_cell_p) / 2
 
@@ -175,82 +178,60 @@ class InitialSEIThickness(bpp.calculations.Calculation):
         return thickness_parameter_values
 
 
-class TargetSEICalendarRate(bpp.calculations.Calculation):
+class TargetSEICalendarRate(bpp.calculations.TargetModelOutput):
     def __init__(self, target_percent_growth_per_month, sei_model):
-        source = "SEI parameters to hit a target aging rate"
-        super().__init__(source)
-        self.target_percent_growth_per_month = target_percent_growth_per_month
-        self.sei_model = sei_model
-
-    def run(self, parameter_values):
-
-        pybamm_parameter_values = pybamm.ParameterValues(dict(parameter_values))
-        pybamm_parameter_values.update(
-            {
-                "SEI reaction exchange current density [A.m-2]": pybamm.InputParameter(
-                    "j0_sei"
-                )
-            },
-            check_already_exists=False,
+        super().__init__(
+            sei_model,
+            "SEI reaction exchange current density [A.m-2]",
+            "SEI current density [A.m-2]",
+            initial_guess=1e-9,
+            source="SEI parameters to hit a target aging rate",
         )
-        model = pybamm_parameter_values.process_model(self.sei_model, inplace=False)
-        pybamm.Discretisation().process_model(model)
+        self.target_percent_growth_per_month = target_percent_growth_per_month
 
+    def target(self, parameter_values):
         L_init = parameter_values["Initial SEI thickness [m]"]
         V_bar_SEI = parameter_values["SEI partial molar volume [m3.mol-1]"]
         F = pybamm.constants.F.value
         z_sei = parameter_values["Ratio of lithium moles to SEI moles"]
         seconds_per_month = 60 * 60 * 24 * 30
         dLdt_target = L_init * (
-            0.01 * self.target_percent_growth_per_month / seconds_per_month
+            0.01 * np.asarray(self.target_percent_growth_per_month) / seconds_per_month
         )
-        j_sei_target = dLdt_target / (-V_bar_SEI / (F * z_sei))
-
-        y0 = model.concatenated_initial_conditions.evaluate()
-        var = model.variables["SEI current density [A.m-2]"]
-
-        def objective(j_sei):
-            return (
-                var.evaluate(y=y0, inputs={"j0_sei": j_sei}) - j_sei_target
-            ).flatten()
-
-        # fit using scipy
-        j0_sei_target = scipy.optimize.root(objective, 1e-9).x[0]
-
-        target_parameter_values = {
-            "SEI reaction exchange current density [A.m-2]": j0_sei_target,
-        }
-
-        return target_parameter_values
-
-
-output_dir = os.path.dirname(__file__)
-model = CalendarAgeing({"SEI": "reaction limited"})
-pipeline = bpp.Pipeline(
-    [
-        ("defaults", bpp.direct_entries.standard_defaults()),
-        ("temperatures", bpp.direct_entries.temperatures(298.15)),
-        ("Schimpe2018", schimpe2018()),
-        ("dimensions", bpp.calculations.AreaToSquareWidthHeight()),
-        ("initial soc", bpp.calculations.InitialSOC()),
-        ("surface area", bpp.calculations.SurfaceArea()),
-        ("capacity", CapacityCalculation()),
-        ("standard SEI", standard_sei_parameters()),
-        ("initial SEI thickness", InitialSEIThickness()),
-        ("sei rates", TargetSEICalendarRate(1, model)),
-    ],
-    cache=output_dir,
-)
-parameter_values = pipeline.run()
-# print(parameter_values)
-
-# # pickle the parameter values
-# import pickle
-
-# output_dir = "/Users/vsulzer/Documents/Energy_storage/battery-model-parameterization"
-# with open(os.path.join(output_dir, "parameter_values.pkl"), "wb") as f:
-#     pickle.dump(parameter_values, f)
-# print(parameter_values)
-
-# bpp.plots.open_circuit(parameter_values)
-# plt.show()
+        return dLdt_target / (-V_bar_SEI / (F * z_sei))
+
+
+def create_pipeline(output_dir=None):
+    model = CalendarAgeing({"SEI": "reaction limited"})
+    return bpp.Pipeline(
+        [
+            ("defaults", bpp.direct_entries.standard_defaults()),
+            ("temperatures", bpp.direct_entries.temperatures(298.15)),
+            ("Schimpe2018", schimpe2018()),
+            ("dimensions", bpp.calculations.AreaToSquareWidthHeight()),
+            ("initial soc", bpp.calculations.InitialSOC()),
+            ("surface area", bpp.calculations.SurfaceArea()),
+            ("capacity", CapacityCalculation()),
+            ("standard SEI", standard_sei_parameters()),
+            ("initial SEI thickness", InitialSEIThickness()),
+            ("sei rates", TargetSEICalendarRate(1, model)),
+        ],
+        cache=output_dir,
+    )
+
+
+if __name__ == "__main__":
+    output_dir = os.path.dirname(__file__)
+    pipeline = create_pipeline(output_dir)
+    parameter_values = pipeline.run()
+    # print(parameter_values)
+
+    # # pickle the parameter values
+    # import pickle
+
+    # with open(os.path.join(output_dir, "parameter_values.pkl"), "wb") as f:
+    #     pickle.dump(parameter_values, f)
+    # print(parameter_values)
+
+    # bpp.plots.open_circuit(parameter_values)
+    # plt.show()
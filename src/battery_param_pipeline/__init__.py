@@ -1,7 +1,13 @@
 from .pipeline import Pipeline
 
+from . import cache
+from . import functions
 from . import direct_entries
 from . import calculations
+from . import data_fits
 from . import latex
+from . import library
 from . import liiondb
 from . import plots
+from . import profiling
+from . import storage
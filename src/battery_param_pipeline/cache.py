@@ -0,0 +1,289 @@
+import functools
+import hashlib
+import inspect
+import io
+import json
+import numbers
+import os
+import pickle
+import sysconfig
+import threading
+import types
+import numpy as np
+import pybamm
+
+
+def fingerprint(obj):
+    """
+    Return a hash of the content of an object (numbers, strings, arrays, containers,
+    functions, pipeline components, ...), which is stable between sessions.
+
+    Functions and classes outside the standard library and installed packages are
+    hashed with their source code, and with the functions, classes and simple
+    values they use from their module (directly or through a module they
+    import), recursively.
+    """
+    h = hashlib.sha256()
+    _update(h, obj, set())
+    return h.hexdigest()
+
+
+def file_fingerprint(filename, chunk_size=2**24):
+    """
+    Return a hash of the content of a file, read in chunks so that large files are
+    never loaded into memory at once.
+    """
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _update(h, obj, seen):
+    h.update(type(obj).__qualname__.encode())
+    if obj is None or isinstance(obj, (bool, numbers.Number, str, bytes)):
+        h.update(repr(obj).encode())
+    elif isinstance(obj, np.ndarray):
+        h.update(str((obj.dtype, obj.shape)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, pybamm.Symbol):
+        # the printed form leaves out data such as the tables of interpolants
+        h.update(str(obj).encode())
+        attributes = {
+            name: getattr(obj, name)
+            for cls in type(obj).__mro__
+            for name in getattr(cls, "__slots__", ())
+            if not name.startswith("_") and hasattr(obj, name)
+        }
+        for name in ["value", "entries"]:
+            if hasattr(obj, name):
+                value = getattr(obj, name)
+                attributes[name] = (
+                    value.toarray() if hasattr(value, "toarray") else value
+                )
+        _update(h, (obj.children, attributes), seen)
+    elif id(obj) in seen:
+        # reference cycle
+        return
+    else:
+        seen.add(id(obj))
+        if isinstance(obj, dict):
+            for k, v in sorted(obj.items(), key=lambda item: str(item[0])):
+                _update(h, k, seen)
+                _update(h, v, seen)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            items = sorted(obj, key=str) if isinstance(obj, (set, frozenset)) else obj
+            for item in items:
+                _update(h, item, seen)
+        elif isinstance(obj, functools.partial):
+            _update(h, (obj.func, obj.args, obj.keywords), seen)
+        elif inspect.isfunction(obj):
+            h.update(_source(obj).encode())
+            closure = [cell.cell_contents for cell in obj.__closure__ or ()]
+            _update(h, (obj.__defaults__, closure), seen)
+            _update_globals(h, obj, seen)
+        elif inspect.isclass(obj) or inspect.isbuiltin(obj) or inspect.ismodule(obj):
+            h.update(getattr(obj, "__qualname__", obj.__name__).encode())
+            if inspect.isclass(obj):
+                _update_class(h, obj, seen)
+        elif hasattr(obj, "__dict__"):
+            for cls in type(obj).__mro__[:-1]:
+                h.update(_source(cls).encode())
+            _update_class(h, type(obj), seen)
+            _update(h, vars(obj), seen)
+        else:
+            # no way to tell if the content is unchanged, so make sure that it
+            # never matches
+            h.update(repr(obj).encode())
+            h.update(str(id(obj)).encode())
+
+
+# Code in these directories only changes with the Python or package versions
+_LIBRARY_PATHS = tuple(
+    {sysconfig.get_paths()[k] for k in ["stdlib", "platstdlib", "purelib", "platlib"]}
+)
+
+
+def _is_user_code(obj):
+    filename = getattr(inspect.getmodule(obj), "__file__", None)
+    return filename is not None and not filename.startswith(_LIBRARY_PATHS)
+
+
+def _global_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _global_names(const)
+    return names
+
+
+def _followed(value):
+    # globals whose changes should change the hash
+    if value is None or isinstance(value, (bool, numbers.Number, str, np.ndarray)):
+        return True
+    return (inspect.isfunction(value) or inspect.isclass(value)) and _is_user_code(
+        value
+    )
+
+
+def _update_globals(h, function, seen):
+    # Functions, classes and simple values a function uses from its module, or
+    # as attributes of (non-library) modules it imports (e.g. `helpers.scale`)
+    if not _is_user_code(function):
+        return
+    names = sorted(_global_names(function.__code__))
+    for name in names:
+        if name not in function.__globals__:
+            continue
+        value = function.__globals__[name]
+        if inspect.ismodule(value) and _is_user_code(value):
+            for attribute in names:
+                if hasattr(value, attribute) and _followed(getattr(value, attribute)):
+                    h.update(f"{name}.{attribute}".encode())
+                    _update(h, getattr(value, attribute), seen)
+        elif _followed(value):
+            h.update(name.encode())
+            _update(h, value, seen)
+
+
+def _update_class(h, cls, seen):
+    # Source of a class and its bases, and the globals used by their methods
+    for base in cls.__mro__[:-1]:
+        if _is_user_code(base):
+            h.update(_source(base).encode())
+            for value in vars(base).values():
+                if inspect.isfunction(value):
+                    _update_globals(h, value, seen)
+
+
+@functools.lru_cache(maxsize=None)
+def _source(obj):
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return obj.__module__ + "." + obj.__qualname__
+
+
+class ComponentCache:
+    """
+    On-disk cache of the parameters generated by pipeline components.
+
+    Outputs are stored under a fingerprint of the component (its source code and
+    constructor arguments) and of the values of the parameters it read, so a
+    component is only rerun if one of these has changed.
+
+    Parameters
+    ----------
+    directory : str
+        Directory in which to store the cached outputs
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _component_directory(self, component):
+        arguments = {
+            k: v
+            for k, v in vars(component).items()
+            if not k.endswith("_")
+            and k not in ["input_keys", "output_keys", "_counters"]
+        }
+        return os.path.join(
+            self.directory, fingerprint((type(component), arguments))[:32]
+        )
+
+    def _inputs_fingerprint(self, parameter_values, input_keys):
+        if input_keys is None:
+            input_keys = sorted(parameter_values)
+        return fingerprint({k: parameter_values[k] for k in input_keys})[:32]
+
+    def load(self, component, parameter_values):
+        """
+        Return the cached `(new_params, keys_read)` for the component, or None if
+        they are not in the cache.
+        """
+        directory = self._component_directory(component)
+        try:
+            with open(os.path.join(directory, "inputs.json")) as f:
+                input_keys = json.load(f)
+            if input_keys is not None and any(
+                k not in parameter_values for k in input_keys
+            ):
+                return None
+            inputs = self._inputs_fingerprint(parameter_values, input_keys)
+            with open(os.path.join(directory, inputs + ".pkl"), "rb") as f:
+                new_params = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        keys_read = None if input_keys is None else set(input_keys)
+        return new_params, keys_read
+
+    def save(self, component, parameter_values, new_params, keys_read):
+        """Store the outputs of a component that has just been run."""
+        try:
+            data = pickle.dumps(new_params)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            # e.g. functions defined locally cannot be pickled, in which case the
+            # component is just rerun every time
+            return
+        input_keys = None if keys_read is None else sorted(keys_read)
+        inputs = self._inputs_fingerprint(parameter_values, input_keys)
+        directory = self._component_directory(component)
+        os.makedirs(directory, exist_ok=True)
+        _atomic_write(os.path.join(directory, inputs + ".pkl"), data)
+        _atomic_write(
+            os.path.join(directory, "inputs.json"), json.dumps(input_keys).encode()
+        )
+
+
+class SharedArray(np.ndarray):
+    """
+    Read-only array mapped from a `.npy` file, which is pickled as the name of the
+    file rather than its content.
+
+    Processes that unpickle it map the same file, so they all share one copy of the
+    data (through the operating system's page cache) instead of each holding their
+    own. Arrays derived from it (slices, results of operations, ...) are ordinary
+    in-memory arrays when pickled. Use :func:`shared_array` to create one.
+    """
+
+    filename = None
+
+    def __array_finalize__(self, obj):
+        self.filename = None
+
+    def __reduce__(self):
+        if self.filename is None:
+            return np.asarray(self).__reduce__()
+        return (_load_shared_array, (self.filename,))
+
+
+def _load_shared_array(filename):
+    array = np.load(filename, mmap_mode="r").view(SharedArray)
+    array.filename = filename
+    return array
+
+
+def shared_array(array, directory):
+    """
+    Store an array in `directory`, under a hash of its content, and return it as a
+    :class:`SharedArray` mapped from the file. Equal arrays are only stored once.
+    """
+    array = np.asarray(array)
+    filename = os.path.join(directory, f"array-{fingerprint(array)}.npy")
+    if not os.path.exists(filename):
+        os.makedirs(directory, exist_ok=True)
+        buffer = io.BytesIO()
+        np.save(buffer, array)
+        _atomic_write(filename, buffer.getvalue())
+    return _load_shared_array(filename)
+
+
+def _atomic_write(filename, data):
+    # write to a temporary file first so that concurrent readers never see a
+    # partially written file
+    tmp = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, filename)
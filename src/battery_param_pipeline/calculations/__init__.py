@@ -1,4 +1,7 @@
 # Calculations
 from .calculation import Calculation
 from .capacity import *
+from .fit import *
 from .geometric import *
+from .model_fit import *
+from .ocp_balance import *
@@ -1,49 +1,180 @@
-import pybamm
-from scipy.optimize import least_squares
+import numpy as np
+import battery_param_pipeline as bpp
 from .calculation import Calculation
 
 
+def _bracketed_root(f, a, b, xtol=1e-12, maxiter=100):
+    """
+    Find a root of the vectorized function `f` in each of the brackets [a, b] with
+    the Illinois (modified regula falsi) method. The result is NaN where f(a) and
+    f(b) do not have opposite signs.
+    """
+    a, b = (np.array(x, dtype=float) for x in np.broadcast_arrays(a, b))
+    fa, fb = f(a), f(b)
+    valid = np.sign(fa) != np.sign(fb)
+    root = np.where(fa == 0, a, np.where(fb == 0, b, np.nan))
+    done = ~valid | (fa == 0) | (fb == 0)
+    side = np.zeros(a.shape)
+    c = np.full(a.shape, np.nan)
+    for _ in range(maxiter):
+        if done.all():
+            break
+        with np.errstate(divide="ignore", invalid="ignore"):
+            c = (a * fb - b * fa) / (fb - fa)
+        # fall back to bisection if the secant step is not strictly inside
+        outside = ~(c > np.minimum(a, b)) | ~(c < np.maximum(a, b))
+        c = np.where(outside, (a + b) / 2, c)
+        fc = f(c)
+
+        # keep the bracket [a, c] if f(c) has the same sign as f(b), otherwise
+        # [c, b], halving f at the end that is kept twice in a row
+        left = np.sign(fc) == np.sign(fb)
+        fa = np.where(left & (side == -1), fa / 2, fa)
+        fb = np.where(~left & (side == 1), fb / 2, fb)
+        a, fa, b, fb = (
+            np.where(left, a, c),
+            np.where(left, fa, fc),
+            np.where(left, c, b),
+            np.where(left, fc, fb),
+        )
+        side = np.where(left, -1, 1)
+
+        converged = ~done & ((fc == 0) | (np.abs(b - a) < xtol))
+        root = np.where(converged, c, root)
+        done |= converged
+    return np.where(done, root, c)
+
+
+def _x_100_bounds(U_n, U_p, C, Cn, Cp, V_max, xtol=1e-12):
+    """
+    Return the bounds on the maximum negative electrode stoichiometry x_100 for which
+    x_0 = x_100 - C/Cn >= 0 and y_0 = y_100 + C/Cp <= 1, or None if there are none
+    for some of the cells.
+
+    The OCPs decrease with stoichiometry, so y_100 increases with x_100, and
+    y_0 <= 1 as long as V_max + U_n(x_100) >= U_p(1 - C/Cp).
+    """
+    lower, ones = C / Cn, np.ones(C.shape)
+    y_max = 1 - C / Cp
+    if (lower > 1).any() or (y_max < 0).any():
+        return None
+    U_p_y_max = U_p(y_max)
+
+    def margin(x_100):
+        return V_max + U_n(x_100) - U_p_y_max
+
+    margin_lower, margin_upper = margin(lower), margin(ones)
+    if (margin_lower < 0).any():
+        return None
+    upper = np.where(
+        margin_upper >= 0, ones, _bracketed_root(margin, lower, ones, xtol)
+    )
+    return lower, upper
+
+
 class ElectrodeSOH(Calculation):
-    def __init__(self):
+    """
+    Calculate the initial concentrations in the electrodes (at 100% SOC) that give
+    the nominal cell capacity between the voltage cut-offs.
+
+    For a given maximum negative electrode stoichiometry x_100, the minimum positive
+    electrode stoichiometry y_100 follows from the upper voltage cut-off, and the
+    stoichiometries at 0% SOC from the capacity. x_100 is then found such that the
+    voltage at 0% SOC is the lower voltage cut-off. Both are found with a
+    vectorized bracketing root-finder, so all the parameters can be arrays (e.g.
+    target capacities and voltage windows for many cells).
+
+    The OCP functions are compiled with
+    :func:`battery_param_pipeline.functions.compile_function`, and each run is
+    warm-started from the solution of the previous run.
+    """
+
+    def __init__(self, xtol=1e-12):
         source = "Calculation of initial concentration in electrodes from capacity"
         super().__init__(source)
+        self.output_keys = [
+            "Initial concentration in negative electrode [mol.m-3]",
+            "Initial concentration in positive electrode [mol.m-3]",
+        ]
+        self.xtol = xtol
+
+        # Attributes generated when the calculation is run
+        self.x_100_ = None
+
+    def _compiled_ocp(self, ocp):
+        compiled = bpp.functions.compile_function(ocp)
+
+        def evaluate(sto):
+            self.count("OCP evaluations")
+            return compiled(sto)
+
+        return evaluate
 
     def run(self, parameter_values):
-        # Fit the value of nLi that gives the correct capacity
-        esoh_solver = pybamm.lithium_ion.ElectrodeSOHSolver(
-            pybamm.ParameterValues(parameter_values._data)
+        U_n = self._compiled_ocp(parameter_values["Negative electrode OCP [V]"])
+        U_p = self._compiled_ocp(parameter_values["Positive electrode OCP [V]"])
+        C_target, Cn, Cp, V_min, V_max = (
+            np.array(x, dtype=float)
+            for x in np.broadcast_arrays(
+                parameter_values["Nominal cell capacity [A.h]"],
+                parameter_values["Negative electrode capacity [A.h]"],
+                parameter_values["Positive electrode capacity [A.h]"],
+                parameter_values["Lower voltage cut-off [V]"],
+                parameter_values["Upper voltage cut-off [V]"],
+            )
         )
-        C_target = parameter_values["Nominal cell capacity [A.h]"]
-        Cn = parameter_values["Negative electrode capacity [A.h]"]
-        Cp = parameter_values["Positive electrode capacity [A.h]"]
-        V_min = parameter_values["Lower voltage cut-off [V]"]
-        V_max = parameter_values["Upper voltage cut-off [V]"]
         c_n_max = parameter_values[
             "Maximum concentration in negative electrode [mol.m-3]"
         ]
         c_p_max = parameter_values[
             "Maximum concentration in positive electrode [mol.m-3]"
         ]
+        zeros = np.zeros(C_target.shape)
+        U_p_min, U_p_max = U_p(zeros + 1), U_p(zeros)
 
-        inputs = {"C_n": Cn, "C_p": Cp, "V_min": V_min, "V_max": V_max}
+        def y_100(x_100):
+            # U_p is decreasing, so outside its range y_100 is at a bound
+            V = V_max + U_n(x_100)
+            y = _bracketed_root(lambda y: U_p(y) - V, zeros, zeros + 1, self.xtol)
+            return np.where(V >= U_p_max, 0, np.where(V <= U_p_min, 1, y))
 
-        def obj(nLi):
-            inputs["n_Li"] = nLi[0]
-            try:
-                esoh_sol = esoh_solver.solve(inputs)
-            except ValueError:
-                return 1e5
-            return C_target - esoh_sol["C"].data[0]
+        def residual(x_100):
+            x_0 = x_100 - C_target / Cn
+            y_0 = y_100(x_100) + C_target / Cp
+            return U_p(y_0) - U_n(x_0) - V_min
 
-        x0 = min(Cn, Cp) * 3600 / pybamm.constants.F.value
-        nLi = least_squares(obj, x0).x[0]
-        inputs["n_Li"] = nLi
-        esoh_sol = esoh_solver.solve(inputs)
+        bounds = _x_100_bounds(U_n, U_p, C_target, Cn, Cp, V_max, self.xtol)
+        if bounds is None:
+            raise ValueError(
+                "Could not find electrode stoichiometries that give the nominal "
+                "cell capacity between the voltage cut-offs"
+            )
+        lower, upper = bounds
+        if self.x_100_ is not None and np.shape(self.x_100_) == C_target.shape:
+            # Warm start: try a narrow bracket around the previous solution first,
+            # and only use the full bracket where it does not contain the root
+            a = np.clip(self.x_100_ - 0.01, lower, upper)
+            b = np.clip(self.x_100_ + 0.01, lower, upper)
+            x_100 = _bracketed_root(residual, a, b, self.xtol)
+            missed = np.isnan(x_100)
+            if missed.any():
+                x_100[missed] = _bracketed_root(residual, lower, upper, self.xtol)[
+                    missed
+                ]
+        else:
+            x_100 = _bracketed_root(residual, lower, upper, self.xtol)
+        if np.isnan(x_100).any():
+            raise ValueError(
+                "Could not find electrode stoichiometries that give the nominal "
+                "cell capacity between the voltage cut-offs"
+            )
+        self.x_100_ = x_100
 
-        x100 = esoh_sol["x_100"].data[0]
-        y100 = esoh_sol["y_100"].data[0]
+        y100 = y_100(x_100)
+        if x_100.ndim == 0:
+            x_100, y100 = float(x_100), float(y100)
         parameter_values = {
-            "Initial concentration in negative electrode [mol.m-3]": x100 * c_n_max,
+            "Initial concentration in negative electrode [mol.m-3]": x_100 * c_n_max,
             "Initial concentration in positive electrode [mol.m-3]": y100 * c_p_max,
         }
 
@@ -51,9 +182,23 @@ class ElectrodeSOH(Calculation):
 
 
 class InitialSOC(Calculation):
+    """
+    Calculate the initial concentrations in the electrodes for a target SOC, by
+    interpolating linearly between the stoichiometries at 0% and 100% SOC.
+
+    "Initial SOC" can be a single value or a numpy array of SOCs, e.g. for a sweep
+    of storage tests, in which case the initial concentrations are arrays with one
+    entry per SOC, computed in one pass. The SOCs broadcast with any other batched
+    parameters.
+    """
+
     def __init__(self):
         source = "Initial concentrations for a target SOC"
         super().__init__(source)
+        self.output_keys = [
+            "Initial concentration in negative electrode [mol.m-3]",
+            "Initial concentration in positive electrode [mol.m-3]",
+        ]
 
     def run(self, parameter_values):
         x_100 = parameter_values["Maximum stoichiometry in negative electrode"]
@@ -62,7 +207,7 @@ class InitialSOC(Calculation):
         y_0 = parameter_values["Maximum stoichiometry in positive electrode"]
         soc = parameter_values["Initial SOC"]
 
-        x = x_0 + soc * (x_100 - x_0) + x_0
+        x = x_0 + soc * (x_100 - x_0)
         y = y_0 - soc * (y_0 - y_100)
 
         c_n_max = parameter_values[
@@ -0,0 +1,142 @@
+import concurrent.futures
+import numpy as np
+import scipy.optimize
+from .calculation import Calculation
+
+
+class Fit(Calculation):
+    """
+    Base class for calculations that fit parameters, by running local optimizations
+    from several starting points and keeping the best converged result.
+
+    Subclasses implement :meth:`initial_guess`, :meth:`residuals` and
+    :meth:`outputs`, and can override :meth:`arguments`, :meth:`bounds` and
+    :meth:`local_fit`. The first starting point is the initial guess, and the
+    others are scattered randomly around it, by up to a factor of 10 in each
+    direction (within the bounds), so the initial guess must not be 0 with more
+    than one starting point. If the elements of the fitted parameters are fitted
+    independently (e.g. one per target), the best converged start is kept for
+    each element separately.
+
+    The number of starting points, how many of them converged, the best cost and
+    the total number of residual evaluations are recorded under "convergence" in
+    the report.
+
+    Parameters
+    ----------
+    source : str
+        Source for the report
+    n_starts : int, optional
+        Number of starting points. Default is 1.
+    n_workers : int, optional
+        Number of processes to run the local optimizations in. Default is 1, which
+        runs them one after the other in this process. With more workers, the
+        calculation and the arguments of :meth:`residuals` must be picklable.
+    seed : int, optional
+        Seed for scattering the starting points. Default is 0.
+    """
+
+    def __init__(self, source, n_starts=1, n_workers=1, seed=0):
+        super().__init__(source)
+        self.n_starts = n_starts
+        self.n_workers = n_workers
+        self.seed = seed
+
+        # Attributes generated when the calculation is run
+        self.convergence_ = None
+
+    def initial_guess(self, parameter_values):
+        """Initial guess for the fitted parameters."""
+        raise NotImplementedError
+
+    def arguments(self, parameter_values):
+        """
+        Extra arguments of :meth:`residuals`, calculated once from the parameter
+        values. Default is the parameter values themselves.
+        """
+        return (parameter_values,)
+
+    def bounds(self, parameter_values):
+        """Lower and upper bounds on the fitted parameters. Default is none."""
+        return -np.inf, np.inf
+
+    def residuals(self, x, *args):
+        """Residuals to minimize (in the least-squares sense)."""
+        raise NotImplementedError
+
+    def outputs(self, x, parameter_values):
+        """Dictionary of parameter values for the best fit `x`."""
+        raise NotImplementedError
+
+    def local_fit(self, x0, bounds, args):
+        """
+        Run a local optimization from `x0`, returning a
+        :class:`scipy.optimize.OptimizeResult` with at least `x`, `success`, `cost`
+        and `nfev`. For independent elements, `success` and `cost` can be arrays
+        with the shape of `x`. Default is :func:`scipy.optimize.least_squares`.
+        """
+        return scipy.optimize.least_squares(
+            self.residuals, x0, bounds=bounds, args=args
+        )
+
+    def starting_points(self, x0, bounds):
+        """Return the starting points of the local optimizations."""
+        if self.n_starts > 1 and np.any(x0 == 0):
+            raise ValueError(
+                f"{self.source}: cannot scatter starting points around an initial "
+                "guess of 0"
+            )
+        rng = np.random.default_rng(self.seed)
+        scale = 10 ** rng.uniform(-1, 1, (self.n_starts - 1,) + x0.shape)
+        lower, upper = bounds
+        return [x0] + list(np.clip(x0 * scale, lower, upper))
+
+    def run(self, parameter_values):
+        args = self.arguments(parameter_values)
+        x0 = np.asarray(self.initial_guess(parameter_values), dtype=float)
+        bounds = self.bounds(parameter_values)
+        starts = self.starting_points(x0, bounds)
+
+        if self.n_workers > 1 and len(starts) > 1:
+            with concurrent.futures.ProcessPoolExecutor(self.n_workers) as executor:
+                futures = [
+                    executor.submit(self.local_fit, start, bounds, args)
+                    for start in starts
+                ]
+                results = [future.result() for future in futures]
+        else:
+            results = [self.local_fit(start, bounds, args) for start in starts]
+
+        # success and cost of each start, per element for independent elements
+        success = np.array([result.success for result in results], dtype=bool)
+        cost = np.where(
+            success, np.array([result.cost for result in results], dtype=float), np.inf
+        )
+        nfev = sum(int(result.nfev) for result in results)
+        self.count("residual evaluations", nfev)
+        self.convergence_ = {
+            "starts": len(starts),
+            "converged": int(success.reshape(len(starts), -1).all(axis=1).sum()),
+            "best cost": None,
+            "residual evaluations": nfev,
+        }
+        if not success.any(axis=0).all():
+            raise ValueError(
+                f"{self.source}: the fit did not converge from any of the "
+                f"{len(starts)} starting points"
+            )
+        best = np.argmin(cost, axis=0)
+        if success.ndim == 1:
+            x = results[best].x
+        else:
+            xs = np.array([result.x for result in results], dtype=float)
+            x = np.take_along_axis(xs, best[None], axis=0)[0]
+        self.convergence_["best cost"] = float(
+            np.sum(np.take_along_axis(cost, np.asarray(best)[None], axis=0))
+        )
+        return self.outputs(x, parameter_values)
+
+    def _generate_report(self, parameter_values, profile=None):
+        super()._generate_report(parameter_values, profile)
+        if self.convergence_ is not None:
+            self.report_["convergence"] = self.convergence_
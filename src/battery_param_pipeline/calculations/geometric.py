@@ -13,6 +13,12 @@ class ElectrodeVolumeFractionFromLoading(Calculation):
         source = "Calculation of electrode volume fraction from loading"
         super().__init__(source)
         self.side = side
+        self.output_keys = []
+        for Side in ["Negative", "Positive"] if side == "both" else [side.capitalize()]:
+            self.output_keys += [
+                f"{Side} electrode capacity [A.h]",
+                f"{Side} electrode active material volume fraction",
+            ]
 
     def run(self, parameter_values):
         F = pybamm.constants.F.value
@@ -54,6 +60,7 @@ class AreaToSquareWidthHeight(Calculation):
     def __init__(self):
         source = "Setting electrode height and width to be the square root of area"
         super().__init__(source)
+        self.output_keys = ["Electrode height [m]", "Electrode width [m]"]
 
     def run(self, parameter_values):
         A_cc = parameter_values["Electrode area [m2]"]
@@ -73,6 +80,10 @@ class SurfaceArea(Calculation):
             "and active material volume fraction"
         )
         super().__init__(source)
+        self.output_keys = [
+            f"{Side} electrode surface area to volume ratio [m-1]"
+            for Side in ["Negative", "Positive"]
+        ]
 
     def run(self, parameter_values):
         surface_area_parameter_values = {}
@@ -0,0 +1,151 @@
+import casadi
+import numpy as np
+import pybamm
+import scipy.optimize
+import battery_param_pipeline as bpp
+from .fit import Fit
+
+
+class TargetModelOutput(Fit):
+    """
+    Fit a parameter so that a variable of a model, evaluated at the initial
+    conditions, takes a target value.
+
+    The model is processed and discretised once with the fitted parameter as an
+    input parameter, and compiled to a CasADi function (with its derivative). All
+    the targets, which can be an array, are then solved for in a single vectorized
+    Newton iteration. The compiled function is reused by later runs with the same
+    values of the other parameters.
+
+    With `n_starts` > 1, the Newton iteration is also started from initial guesses
+    scattered around `initial_guess`, optionally in a process pool, and the
+    converged solution with the smallest residual is kept for each target (see
+    :class:`Fit`).
+
+    Parameters
+    ----------
+    model : :class:`pybamm.BaseModel`
+        Model to evaluate
+    parameter : str
+        Name of the parameter to fit
+    variable : str
+        Name of the model variable that should hit the target
+    target : float or array-like, optional
+        Target value(s) of the variable. Subclasses can instead override
+        :meth:`target` to calculate it from the other parameters.
+    initial_guess : float, optional
+        Initial guess for the parameter. Default is 1.
+    source : str, optional
+        Source for the report
+    n_starts, n_workers, seed : int, optional
+        Number of initial guesses, and how to run them (see :class:`Fit`)
+    """
+
+    def __init__(
+        self,
+        model,
+        parameter,
+        variable,
+        target=None,
+        initial_guess=1,
+        source=None,
+        n_starts=1,
+        n_workers=1,
+        seed=0,
+    ):
+        if source is None:
+            source = f"'{parameter}' fitted so that '{variable}' hits a target value"
+        super().__init__(source, n_starts=n_starts, n_workers=n_workers, seed=seed)
+        self.model = model
+        self.parameter = parameter
+        self.variable = variable
+        self._target = target
+        self._initial_guess = initial_guess
+        self.output_keys = [parameter]
+
+        # Attributes generated when the calculation is run
+        self.compiled_ = {}
+
+    def __getstate__(self):
+        # CasADi functions are not sent to other processes
+        state = self.__dict__.copy()
+        state["compiled_"] = {}
+        return state
+
+    def target(self, parameter_values):
+        """Target value(s) of the variable."""
+        return self._target
+
+    def compile(self, parameter_values):
+        """
+        Return CasADi functions of the fitted parameter giving the variable at the
+        initial conditions and its derivative. Both can be called with a row vector
+        of parameter values.
+        """
+        key = bpp.cache.fingerprint(dict(parameter_values))
+        if key not in self.compiled_:
+            self.count("model compilations")
+            name = "fitted parameter"
+            pybamm_parameter_values = parameter_values.to_pybamm(
+                {self.parameter: pybamm.InputParameter(name)}
+            )
+            model = pybamm_parameter_values.process_model(self.model, inplace=False)
+            disc = pybamm.Discretisation()
+            disc.process_model(model)
+            variable = disc.process_symbol(
+                pybamm_parameter_values.process_symbol(
+                    self.model.variables[self.variable]
+                )
+            )
+
+            p = casadi.MX.sym(name)
+            inputs = {name: p}
+            y0 = model.concatenated_initial_conditions.to_casadi(inputs=inputs)
+            output = variable.to_casadi(t=casadi.MX(0), y=y0, inputs=inputs)
+            self.compiled_[key] = (
+                casadi.Function("f", [p], [output]),
+                casadi.Function("df", [p], [casadi.jacobian(output, p)]),
+            )
+        return self.compiled_[key]
+
+    def initial_guess(self, parameter_values):
+        target = np.asarray(self.target(parameter_values), dtype=float)
+        return np.full(target.shape, self._initial_guess, dtype=float)
+
+    def arguments(self, parameter_values):
+        f, df = self.compile(parameter_values)
+        target = np.asarray(self.target(parameter_values), dtype=float)
+        return f, df, target
+
+    def residuals(self, x, f, df, target):
+        return f(np.reshape(x, (1, -1))).full().reshape(np.shape(x)) - target
+
+    def local_fit(self, x0, bounds, args):
+        f, df, target = args
+        nfev = 0
+
+        def residual(p):
+            nonlocal nfev
+            nfev += 1
+            return self.residuals(p, *args)
+
+        def derivative(p):
+            return df(np.reshape(p, (1, -1))).full().reshape(np.shape(p))
+
+        if target.ndim == 0:
+            x, info = scipy.optimize.newton(
+                residual, float(x0), fprime=derivative, full_output=True, disp=False
+            )
+            success = info.converged
+        else:
+            x, converged, _ = scipy.optimize.newton(
+                residual, x0.ravel(), fprime=derivative, full_output=True
+            )
+            # the targets are independent, so each one converges separately
+            x = x.reshape(target.shape)
+            success = converged.reshape(target.shape)
+        cost = 0.5 * self.residuals(x, *args) ** 2
+        return scipy.optimize.OptimizeResult(x=x, success=success, cost=cost, nfev=nfev)
+
+    def outputs(self, x, parameter_values):
+        return {self.parameter: x}
@@ -1,9 +1,110 @@
-import pybamm
-from scipy.optimize import least_squares
+import numpy as np
+import battery_param_pipeline as bpp
 from .calculation import Calculation
+from .capacity import _bracketed_root, _x_100_bounds
+
+
+class _OCPTable:
+    """
+    OCP tabulated on a dense stoichiometry grid, with a monotone inverse.
+    """
+
+    def __init__(self, ocp, n_points):
+        self.sto = np.linspace(0, 1, n_points)
+        self.U = bpp.functions.compile_function(ocp)(self.sto)
+        # OCPs decrease with stoichiometry, remove any noise that would make the
+        # inverse multi-valued
+        U_monotone = np.minimum.accumulate(self.U)
+        self._U_increasing = U_monotone[::-1]
+        self._sto_increasing = self.sto[::-1]
+
+    def __call__(self, sto):
+        return np.interp(sto, self.sto, self.U)
+
+    def inverse(self, U):
+        # values outside the range of the OCP are clipped to a bound
+        return np.interp(U, self._U_increasing, self._sto_increasing)
 
 
 class OCPBalance(Calculation):
-    def __init__(self):
+    """
+    Calculate the stoichiometry windows of the electrodes that give the nominal cell
+    capacity between the voltage cut-offs.
+
+    The OCPs are tabulated once on dense stoichiometry grids (and the tables reused
+    for later runs with the same OCP functions), so balancing only requires
+    vectorized table lookups. All the parameters other than the OCPs can be arrays,
+    to balance many cells in one call.
+
+    Parameters
+    ----------
+    n_points : int, optional
+        Number of points in the stoichiometry grids. Default is 10001.
+    """
+
+    def __init__(self, n_points=10001):
         source = "OCP Balance"
         super().__init__(source)
+        self.n_points = n_points
+        self.output_keys = [
+            "Maximum stoichiometry in negative electrode",
+            "Minimum stoichiometry in negative electrode",
+            "Minimum stoichiometry in positive electrode",
+            "Maximum stoichiometry in positive electrode",
+        ]
+
+        # Attributes generated when the calculation is run
+        self.tables_ = {}
+
+    def __getstate__(self):
+        # The tables are keyed by OCP functions, which may not be picklable
+        state = self.__dict__.copy()
+        state["tables_"] = {}
+        return state
+
+    def _table(self, ocp):
+        if ocp not in self.tables_:
+            self.tables_[ocp] = _OCPTable(ocp, self.n_points)
+        return self.tables_[ocp]
+
+    def run(self, parameter_values):
+        U_n = self._table(parameter_values["Negative electrode OCP [V]"])
+        U_p = self._table(parameter_values["Positive electrode OCP [V]"])
+        C, Cn, Cp, V_min, V_max = (
+            np.array(x, dtype=float)
+            for x in np.broadcast_arrays(
+                parameter_values["Nominal cell capacity [A.h]"],
+                parameter_values["Negative electrode capacity [A.h]"],
+                parameter_values["Positive electrode capacity [A.h]"],
+                parameter_values["Lower voltage cut-off [V]"],
+                parameter_values["Upper voltage cut-off [V]"],
+            )
+        )
+
+        def y_100(x_100):
+            return U_p.inverse(V_max + U_n(x_100))
+
+        def residual(x_100):
+            return U_p(y_100(x_100) + C / Cp) - U_n(x_100 - C / Cn) - V_min
+
+        # the stoichiometries must stay in [0, 1], where the tables are defined
+        bounds = _x_100_bounds(U_n, U_p, C, Cn, Cp, V_max)
+        if bounds is not None:
+            x_100 = _bracketed_root(residual, *bounds)
+        if bounds is None or np.isnan(x_100).any():
+            raise ValueError(
+                "Could not find electrode stoichiometries that give the nominal "
+                "cell capacity between the voltage cut-offs"
+            )
+        y100 = y_100(x_100)
+        x_0 = x_100 - C / Cn
+        y_0 = y100 + C / Cp
+        if x_100.ndim == 0:
+            x_100, x_0, y100, y_0 = (float(x) for x in [x_100, x_0, y100, y_0])
+
+        return {
+            "Maximum stoichiometry in negative electrode": x_100,
+            "Minimum stoichiometry in negative electrode": x_0,
+            "Minimum stoichiometry in positive electrode": y100,
+            "Maximum stoichiometry in positive electrode": y_0,
+        }
@@ -0,0 +1,3 @@
+# Fits to data
+from .data_fit import DataFit
+from .ocp import *
@@ -0,0 +1,7 @@
+import battery_param_pipeline as bpp
+
+
+class DataFit(bpp.pipeline._PipelineElement):
+    def __init__(self, source):
+        super().__init__(source)
+        self._type = "data fit"
@@ -0,0 +1,403 @@
+import concurrent.futures
+import numpy as np
+import pandas as pd
+import pybamm
+from functools import partial
+from .data_fit import DataFit
+
+
+def _tanh_ocp(coefficients, sto):
+    # OCP of the form fitted by `fit_ocp_curves`, with the coefficients laid out as
+    # [constant, slope, exponential amplitude, exponential rate, tanh amplitudes,
+    # tanh steepnesses, tanh centres]
+    # plain floats, so that products with pybamm symbols give pybamm symbols
+    coefficients = [float(c) for c in coefficients]
+    n_tanh = (len(coefficients) - 4) // 3
+    constant, slope, exp_amplitude, exp_rate = coefficients[:4]
+    u = constant + slope * sto
+    if exp_amplitude != 0:
+        u = u + exp_amplitude * pybamm.exp(-exp_rate * sto)
+    for a, b, c in zip(
+        coefficients[4 : 4 + n_tanh],
+        coefficients[4 + n_tanh : 4 + 2 * n_tanh],
+        coefficients[4 + 2 * n_tanh :],
+    ):
+        u = u + a * pybamm.tanh(b * (sto - c))
+    return u
+
+
+def _basis(p, sto, n_tanh):
+    # The OCP is a linear combination of the basis functions [1, x, exp(-k x),
+    # tanh(b_i (x - c_i))], with coefficients [u_0, u_1, A, a_i]. Also return the
+    # derivatives of the terms with respect to [k, b_i, c_i], per unit amplitude
+    n = n_tanh
+    k = p[:, 3:4]
+    b = p[:, 4 + n : 4 + 2 * n, None]
+    c = p[:, 4 + 2 * n :, None]
+
+    basis = np.empty((p.shape[0], 3 + n, sto.shape[1]))
+    derivatives = np.empty((p.shape[0], 1 + 2 * n, sto.shape[1]))
+    with np.errstate(over="ignore", invalid="ignore"):
+        e = np.exp(-k * sto)
+        shifted = sto[:, None, :] - c
+        t = np.tanh(b * shifted)
+        sech2 = 1 - t**2
+        basis[:, 0] = 1
+        basis[:, 1] = sto
+        basis[:, 2] = e
+        basis[:, 3:] = t
+        derivatives[:, 0] = -sto * e
+        derivatives[:, 1 : 1 + n] = sech2 * shifted
+        derivatives[:, 1 + n :] = -sech2 * b
+    return basis, derivatives
+
+
+def _random_starts(sto, mask, n_tanh, exponential, rng):
+    # Place the tanh steps randomly over the data, with random steepnesses
+    n_curves = sto.shape[0]
+    lower = np.where(mask, sto, np.inf).min(axis=1, keepdims=True)
+    upper = np.where(mask, sto, -np.inf).max(axis=1, keepdims=True)
+    span = upper - lower
+
+    p = np.zeros((n_curves, 4 + 3 * n_tanh))
+    if exponential:
+        p[:, 3:4] = 10 ** rng.uniform(1, 2, (n_curves, 1)) / span
+    p[:, 4 + n_tanh : 4 + 2 * n_tanh] = (
+        10 ** rng.uniform(1, 2, (n_curves, n_tanh)) / span
+    )
+    p[:, 4 + 2 * n_tanh :] = lower + span * np.sort(
+        rng.uniform(size=(n_curves, n_tanh)), axis=1
+    )
+    return p
+
+
+def _fit_chunk(
+    sto,
+    voltage,
+    n_tanh,
+    exponential,
+    initial_coefficients,
+    n_starts,
+    seed,
+    max_iterations,
+    screening_iterations,
+    tol,
+):
+    # Fit a chunk of curves at once (see `fit_ocp_curves`)
+    n_curves = len(sto)
+    n_points = max(len(x) for x in sto)
+    mask = np.zeros((n_curves, n_points), dtype=bool)
+    sto_padded = np.zeros((n_curves, n_points))
+    voltage_padded = np.zeros((n_curves, n_points))
+    for i, (x, v) in enumerate(zip(sto, voltage)):
+        mask[i, : len(x)] = True
+        sto_padded[i, : len(x)] = x
+        voltage_padded[i, : len(x)] = v
+
+    if initial_coefficients is None:
+        # fit every start of every curve in the same batch
+        n_starts = max(n_starts, 1)
+        mask = np.repeat(mask, n_starts, axis=0)
+        sto = np.repeat(sto_padded, n_starts, axis=0)
+        voltage = np.repeat(voltage_padded, n_starts, axis=0)
+        rng = np.random.default_rng(seed)
+        p = _random_starts(sto, mask, n_tanh, exponential, rng)
+    else:
+        n_starts = 1
+        sto, voltage = sto_padded, voltage_padded
+        p = np.array(
+            np.broadcast_to(initial_coefficients, (n_curves, 4 + 3 * n_tanh)),
+            dtype=float,
+        )
+
+    linear = [0, 1] + ([2] if exponential else []) + list(range(4, 4 + n_tanh))
+    nonlinear = ([3] if exponential else []) + list(range(4 + n_tanh, 4 + 3 * n_tanh))
+    # amplitude multiplying the derivative with respect to each nonlinear coefficient
+    amplitudes = ([2] if exponential else []) + list(range(4, 4 + n_tanh)) * 2
+    if not exponential:
+        p[:, 2:4] = 0
+
+    def evaluate(p, index=slice(None)):
+        # Solve for the amplitudes, and return them with the residuals, the
+        # (projected) Jacobian with respect to the nonlinear coefficients, and the
+        # sum of squared residuals
+        basis, derivatives = _basis(p, sto[index], n_tanh)
+        if not exponential:
+            basis = np.delete(basis, 2, axis=1)
+            derivatives = derivatives[:, 1:]
+        basis *= mask[index, None, :]
+        # non-finite fits (e.g. overflowing exponentials) are rejected below
+        with np.errstate(over="ignore", invalid="ignore"):
+            normal = basis @ np.swapaxes(basis, 1, 2)
+            normal += (
+                1e-12
+                * np.trace(normal, axis1=1, axis2=2)[:, None, None]
+                * np.eye(len(linear))
+            )
+            amplitude = np.linalg.solve(normal, basis @ voltage[index, :, None])
+            r = (np.swapaxes(basis, 1, 2) @ amplitude)[..., 0] - voltage[index]
+            r *= mask[index]
+            p = p.copy()
+            p[:, linear] = amplitude[..., 0]
+
+            jacobian = derivatives * p[:, amplitudes, None] * mask[index, None, :]
+            projection = np.linalg.solve(normal, basis @ np.swapaxes(jacobian, 1, 2))
+            jacobian -= np.swapaxes(projection, 1, 2) @ basis
+        cost = np.sum(r**2, axis=1)
+        # steps to non-finite residuals are rejected
+        return p, r, jacobian, np.where(np.isfinite(cost), cost, np.inf)
+
+    p, r, jacobian, cost = evaluate(p)
+    damping = np.full(len(p), 1e-3)
+    # starts that are already non-finite are abandoned (and never converged)
+    abandoned = ~np.isfinite(cost)
+    converged = np.zeros(len(p), dtype=bool)
+    identity = np.eye(len(nonlinear))
+    for iteration in range(max_iterations):
+        if iteration == screening_iterations and n_starts > 1:
+            # only carry on with the most promising start of each curve
+            best = np.argmin(cost.reshape(n_curves, n_starts), axis=1)
+            screened = np.ones((n_curves, n_starts), dtype=bool)
+            screened[np.arange(n_curves), best] = False
+            abandoned |= screened.ravel()
+        # only iterate on the fits that have not converged or been abandoned
+        active = np.flatnonzero(~converged & ~abandoned)
+        J = jacobian[active]
+        normal = J @ np.swapaxes(J, 1, 2)
+        gradient = (J @ r[active, :, None])[..., 0]
+        diagonal = np.diagonal(normal, axis1=1, axis2=2)
+        scaling = np.maximum(
+            diagonal, 1e-12 * diagonal.max(axis=1, keepdims=True) + 1e-300
+        )
+        damped = normal + damping[active, None, None] * scaling[:, :, None] * identity
+        with np.errstate(invalid="ignore"):
+            step = np.linalg.solve(damped, -gradient[..., None])[..., 0]
+
+        p_new = p[active].copy()
+        p_new[:, nonlinear] += step
+        p_new, r_new, jacobian_new, cost_new = evaluate(p_new, active)
+        better = cost_new < cost[active]
+        improved = active[better]
+
+        decrease = cost[improved] - cost_new[better]
+        converged[improved[decrease <= tol * cost[improved]]] = True
+        p[improved] = p_new[better]
+        r[improved] = r_new[better]
+        jacobian[improved] = jacobian_new[better]
+        cost[improved] = cost_new[better]
+        damping[active] = np.where(better, damping[active] / 3, damping[active] * 2)
+        # the damping only grows this large at a minimum
+        converged |= damping > 1e10
+        if (converged | abandoned).all():
+            break
+
+    # keep the best start of each curve
+    cost = cost.reshape(n_curves, n_starts)
+    best = np.argmin(cost, axis=1)
+    index = np.arange(n_curves) * n_starts + best
+    rms_error = np.sqrt(cost[np.arange(n_curves), best] / mask[index].sum(axis=1))
+    return p[index], rms_error, converged[index] & np.isfinite(rms_error)
+
+
+def fit_ocp_curves(
+    sto,
+    voltage,
+    n_tanh=3,
+    exponential=True,
+    initial_coefficients=None,
+    n_starts=8,
+    seed=0,
+    max_iterations=200,
+    screening_iterations=20,
+    tol=1e-10,
+    chunk_size=32,
+    n_workers=1,
+):
+    """
+    Fit OCP curves of the form
+
+    .. math::
+        U(x) = u_0 + u_1 x + A e^{-k x} + \\sum_i a_i \\tanh(b_i (x - c_i)),
+
+    as used for the graphite and NMC OCPs in the examples, by least squares.
+
+    All the curves are fitted at once, with vectorized NumPy operations over the
+    whole batch. The OCP is linear in the amplitudes :math:`u_0, u_1, A, a_i`, so
+    these are solved for exactly, and a Levenberg-Marquardt iteration, with
+    analytic Jacobians and damping adapted to each curve, only searches over
+    :math:`k, b_i, c_i` (variable projection). Since the fits have local minima,
+    each curve is fitted from `n_starts` random placements of the tanh steps, in
+    the same batch. After `screening_iterations`, only the best start of each
+    curve carries on.
+
+    To bound the memory used, the curves are fitted in chunks of `chunk_size`,
+    which can be spread over `n_workers` processes.
+
+    Parameters
+    ----------
+    sto, voltage : list of array-like
+        Stoichiometries and voltages of each curve. Curves can have different
+        numbers of points.
+    n_tanh : int, optional
+        Number of tanh terms. Default is 3.
+    exponential : bool, optional
+        Whether to include the exponential term (e.g. for graphite at low
+        stoichiometry). Default is True.
+    initial_coefficients : array-like, optional
+        Initial coefficients, for all the curves or one row per curve, laid out as
+        :math:`[u_0, u_1, A, k, a_1, ..., b_1, ..., c_1, ...]` (only :math:`k, b_i,
+        c_i` are used), in which case there is a single start. Default is None,
+        which uses random starts.
+    n_starts : int, optional
+        Number of random starts per curve. Default is 8.
+    seed : int, optional
+        Seed for the random starts. Default is 0.
+    max_iterations : int, optional
+        Maximum number of iterations. Default is 200.
+    screening_iterations : int, optional
+        Number of iterations for which all the starts are run. Default is 20.
+    tol : float, optional
+        Relative decrease in the sum of squared residuals below which a fit has
+        converged. Default is 1e-10.
+    chunk_size : int, optional
+        Number of curves fitted at once. Default is 32.
+    n_workers : int, optional
+        Number of processes to fit the chunks in. Default is 1, which fits them
+        one after the other in this process.
+
+    Returns
+    -------
+    coefficients : :class:`numpy.ndarray`
+        Fitted coefficients, with one row per curve
+    rms_error : :class:`numpy.ndarray`
+        Root mean square error of each fit [V]
+    converged : :class:`numpy.ndarray`
+        Whether each fit converged
+    """
+    n_curves = len(sto)
+    if initial_coefficients is not None:
+        initial_coefficients = np.broadcast_to(
+            initial_coefficients, (n_curves, 4 + 3 * n_tanh)
+        )
+    chunks = [slice(i, i + chunk_size) for i in range(0, n_curves, chunk_size)]
+    arguments = [
+        (
+            sto[chunk],
+            voltage[chunk],
+            n_tanh,
+            exponential,
+            None if initial_coefficients is None else initial_coefficients[chunk],
+            n_starts,
+            # independent random starts for each chunk
+            [seed, i],
+            max_iterations,
+            screening_iterations,
+            tol,
+        )
+        for i, chunk in enumerate(chunks)
+    ]
+    if n_workers > 1 and len(chunks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(n_workers) as executor:
+            results = list(executor.map(_fit_chunk, *zip(*arguments)))
+    else:
+        results = [_fit_chunk(*args) for args in arguments]
+    coefficients, rms_error, converged = zip(*results)
+    return (
+        np.concatenate(coefficients),
+        np.concatenate(rms_error),
+        np.concatenate(converged),
+    )
+
+
+class OCPFit(DataFit):
+    """
+    Fit OCPs to half-cell data (see :func:`fit_ocp_curves`), giving
+    function-valued parameters.
+
+    Parameters
+    ----------
+    data : str or :class:`pandas.DataFrame`
+        Half-cell data, or the name of a CSV file to read it from
+    parameters : str or dict
+        Name of the OCP parameter, if `data` is a single curve. Otherwise, a
+        dictionary mapping the value of `curve_column` for each curve to the
+        name of the parameter it is fitted to.
+    sto_column, voltage_column : str, optional
+        Columns of the stoichiometry and voltage. Default is "Stoichiometry" and
+        "Voltage [V]".
+    curve_column : str, optional
+        Column identifying the curve each point belongs to, if there is more than
+        one curve
+    source : str, optional
+        Source for the report
+    **kwargs
+        Options for :func:`fit_ocp_curves` (e.g. `n_tanh`)
+    """
+
+    def __init__(
+        self,
+        data,
+        parameters,
+        sto_column="Stoichiometry",
+        voltage_column="Voltage [V]",
+        curve_column=None,
+        source=None,
+        **kwargs,
+    ):
+        if source is None:
+            source = "OCPs fitted to half-cell data"
+            if isinstance(data, str):
+                source += r" (from \verb!" + data + r"!)"
+        super().__init__(source)
+        if isinstance(data, str):
+            data = pd.read_csv(data)
+        if isinstance(parameters, str):
+            if curve_column is not None:
+                raise ValueError(
+                    "'parameters' must be a dictionary when 'curve_column' is given"
+                )
+            parameters = {None: parameters}
+            curve = np.zeros(len(data), dtype=int)
+            curve_names = [None]
+        else:
+            curve_names = list(parameters)
+            curve = pd.Index(curve_names).get_indexer(data[curve_column])
+            missing = [name for i, name in enumerate(curve_names) if i not in curve]
+            if missing:
+                raise ValueError(f"No data for curve '{missing[0]}'")
+
+        # Split the data into curves in one pass, rather than filtering the table
+        # once per curve
+        order = np.argsort(curve, kind="stable")
+        curve = curve[order]
+        boundaries = np.searchsorted(curve, np.arange(len(curve_names) + 1))
+        sto = data[sto_column].to_numpy(dtype=float)[order]
+        voltage = data[voltage_column].to_numpy(dtype=float)[order]
+        self.sto = [sto[i:j] for i, j in zip(boundaries[:-1], boundaries[1:])]
+        self.voltage = [voltage[i:j] for i, j in zip(boundaries[:-1], boundaries[1:])]
+
+        self.parameters = [parameters[name] for name in curve_names]
+        self.options = kwargs
+        self.input_keys = []
+        self.output_keys = list(self.parameters)
+
+        # Attributes generated when the fit is run
+        self.fit_ = None
+
+    def run(self, parameter_values):
+        coefficients, rms_error, converged = fit_ocp_curves(
+            self.sto, self.voltage, **self.options
+        )
+        self.fit_ = {
+            parameter: {"RMS error [V]": float(rms), "converged": bool(ok)}
+            for parameter, rms, ok in zip(self.parameters, rms_error, converged)
+        }
+        return {
+            parameter: partial(_tanh_ocp, p)
+            for parameter, p in zip(self.parameters, coefficients)
+        }
+
+    def _generate_report(self, parameter_values, profile=None):
+        super()._generate_report(parameter_values, profile)
+        if self.fit_ is not None:
+            self.report_["fit"] = self.fit_
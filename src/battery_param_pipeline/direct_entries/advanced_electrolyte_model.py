@@ -1,32 +1,212 @@
 import pybamm
 import battery_param_pipeline as bpp
+import io
 import numpy as np
+import os
 import pandas as pd
 from functools import partial
-from scipy.interpolate import interp1d
 
+# pybamm name, AEM column and conversion factor to SI units of each property
+_AEM_PARAMETERS = [
+    ("Electrolyte conductivity [S.m-1]", "Cond (mS) 2", 0.1),
+    ("Cation transference number", "t+(a)", 1),
+    ("Electrolyte diffusivity [m2.s-1]", "Diff. Coeff. cm^2/s", 1e-4),
+]
 
-def _get_2d_mesh_data(data, parameter):
-    cs_interp = np.linspace(0, 3, 1000)
-    Ts = np.unique(data["Temperature(C)"])
-    data_interp = np.empty((len(cs_interp), len(Ts)))
-    for i, T in enumerate(Ts):
-        subdata = data[data["Temperature(C)"] == T]
-        data_interp[:, i] = interp1d(
-            subdata["c"],
-            subdata[parameter],
-            bounds_error=False,
-            fill_value="extrapolate",
-        )(cs_interp)
-    return cs_interp, Ts, data_interp
+
+class _MeshBuilder:
+    """
+    Build the interpolation tables of AEM data incrementally, from chunks of rows.
+
+    The columns `parameters` are interpolated linearly in concentration onto
+    `cs_interp` at each temperature, extrapolating linearly outside the data. Only
+    the data points on either side of each interpolation point, and the two lowest
+    and highest concentrations (for extrapolation), are kept for each temperature,
+    so the memory used does not depend on the number of rows.
+    """
+
+    def __init__(self, parameters, cs_interp):
+        self.parameters = parameters
+        self.cs_interp = cs_interp
+        # For each temperature: concentrations and values of the nearest data
+        # points at or below and above each interpolation point, and of the
+        # extreme data points
+        self._below = {}
+        self._above = {}
+        self._extremes = {}
+
+    def add(self, data):
+        T = data["Temperature(C)"].to_numpy(dtype=float)
+        c = data["c"].to_numpy(dtype=float)
+        values = data[self.parameters].to_numpy(dtype=float)
+
+        # Group the chunk by temperature once, sorted by concentration
+        order = np.lexsort((c, T))
+        T, c, values = T[order], c[order], values[order]
+        Ts, starts = np.unique(T, return_index=True)
+        for T, group in zip(Ts, np.split(np.arange(len(c)), starts[1:])):
+            self._add_group(T, c[group], values[group])
+
+    def _add_group(self, T, c, values):
+        q = self.cs_interp
+        n_parameters = len(self.parameters)
+        if T not in self._extremes:
+            self._below[T] = (
+                np.full(len(q), -np.inf),
+                np.zeros((len(q), n_parameters)),
+            )
+            self._above[T] = (np.full(len(q), np.inf), np.zeros((len(q), n_parameters)))
+            self._extremes[T] = (np.empty(0), np.empty((0, n_parameters)))
+
+        # nearest points at or below, and above, in this chunk
+        i = np.searchsorted(c, q, side="right")
+        below_c, below_values = self._below[T]
+        closer = (i > 0) & (c[np.maximum(i - 1, 0)] > below_c)
+        below_c[closer] = c[i[closer] - 1]
+        below_values[closer] = values[i[closer] - 1]
+        above_c, above_values = self._above[T]
+        closer = (i < len(c)) & (c[np.minimum(i, len(c) - 1)] < above_c)
+        above_c[closer] = c[i[closer]]
+        above_values[closer] = values[i[closer]]
+
+        extremes_c, extremes_values = self._extremes[T]
+        # two lowest and highest distinct concentrations in this chunk
+        _, ends = np.unique(c, return_index=True)
+        if len(ends) > 4:
+            ends = ends[[0, 1, -2, -1]]
+        extremes_c = np.r_[extremes_c, c[ends]]
+        extremes_values = np.r_[extremes_values, values[ends]]
+        _, unique = np.unique(extremes_c, return_index=True)
+        if len(unique) > 4:
+            unique = unique[[0, 1, -2, -1]]
+        self._extremes[T] = (extremes_c[unique], extremes_values[unique])
+
+    def mesh(self):
+        """
+        Return the concentrations, the temperatures, and the interpolated data, of
+        shape (concentrations, temperatures, parameters).
+        """
+        q = self.cs_interp
+        Ts = np.array(sorted(self._extremes))
+        data_interp = np.empty((len(q), len(Ts), len(self.parameters)))
+        for j, T in enumerate(Ts):
+            extremes_c, extremes_values = self._extremes[T]
+            if len(extremes_c) < 2:
+                raise ValueError(
+                    "AEM data must have at least two concentrations per temperature"
+                )
+            below_c, below_values = (x.copy() for x in self._below[T])
+            above_c, above_values = (x.copy() for x in self._above[T])
+            # extrapolate from the two lowest or highest points outside the data
+            low = np.isinf(below_c)
+            below_c[low], below_values[low] = extremes_c[0], extremes_values[0]
+            above_c[low], above_values[low] = extremes_c[1], extremes_values[1]
+            high = np.isinf(above_c)
+            below_c[high], below_values[high] = extremes_c[-2], extremes_values[-2]
+            above_c[high], above_values[high] = extremes_c[-1], extremes_values[-1]
+
+            weight = ((q - below_c) / (above_c - below_c))[:, None]
+            data_interp[:, j] = below_values + weight * (above_values - below_values)
+        return q, Ts, data_interp
+
+
+def _get_2d_mesh_data(data, parameters, cs_interp):
+    """
+    Interpolate the columns `parameters` of AEM data linearly in concentration onto
+    `cs_interp` at each temperature (see :class:`_MeshBuilder`).
+    """
+    builder = _MeshBuilder(parameters, cs_interp)
+    builder.add(data)
+    return builder.mesh()
+
+
+def _adaptive_knots(cs, data, rtol):
+    """
+    Return the indices of a subset of the concentrations `cs` such that linear
+    interpolation of `data` (concentrations x temperatures) between them reproduces
+    it to within `rtol` times its largest magnitude, at every temperature.
+
+    Starting from the end points, the point with the largest error in each segment
+    that does not meet the tolerance is added, until they all do.
+    """
+    atol = rtol * np.max(np.abs(data))
+    knots = np.array([0, len(cs) - 1])
+    while True:
+        segment = np.searchsorted(knots, np.arange(len(cs)), side="right") - 1
+        segment = np.minimum(segment, len(knots) - 2)
+        lo, hi = knots[segment], knots[segment + 1]
+        weight = ((cs - cs[lo]) / (cs[hi] - cs[lo]))[:, None]
+        error = np.abs(data[lo] + weight * (data[hi] - data[lo]) - data).max(axis=1)
+
+        # worst point of each segment
+        order = np.lexsort((-error, segment))
+        first = np.r_[True, segment[order][1:] != segment[order][:-1]]
+        worst = order[first]
+        worst = worst[error[worst] > atol]
+        if len(worst) == 0:
+            return knots
+        knots = np.union1d(knots, worst)
 
 
 def _pybamm_interp(cs_interp, Ts, data, c, T):
     return pybamm.Interpolant((cs_interp, Ts), data, [c, T])
 
 
-def advanced_electrolyte_model(filename):
-    aem_data = pd.read_csv(filename)
+def _read_aem_csv(filename, chunksize):
+    # Only parse the columns that are used, a chunk of rows at a time
+    columns = ["Temperature(C)", "c"] + [name for _, name, _ in _AEM_PARAMETERS]
+    builder = _MeshBuilder(columns[2:], cs_interp=np.linspace(0, 3, 1000))
+    with pd.read_csv(filename, usecols=columns, chunksize=chunksize) as chunks:
+        for chunk in chunks:
+            builder.add(chunk)
+    return builder.mesh()
+
+
+def advanced_electrolyte_model(filename, cache=None, rtol=None, chunksize=10**6):
+    """
+    Electrolyte properties from an Advanced Electrolyte Model export, interpolated
+    in concentration and temperature.
+
+    Parameters
+    ----------
+    filename : str
+        CSV file exported from the Advanced Electrolyte Model
+    cache : str, optional
+        Directory to store the interpolation tables in, keyed by a hash of the
+        content of the file, so that loading the same data again skips parsing it.
+        The tables of the properties are then also mapped from files in it (see
+        :class:`battery_param_pipeline.cache.SharedArray`), so that worker
+        processes the parameters are sent to share one copy of them. Default is
+        None, which does not store them.
+    rtol : float or dict, optional
+        Interpolation error tolerance, relative to the largest magnitude of each
+        property, for all the properties or as a dictionary by parameter name. If
+        given, each property is tabulated on its own non-uniform concentration
+        grid, with as few points as are needed to reproduce the uniform
+        1000-point table to within the tolerance, which makes the interpolants
+        smaller and faster to evaluate. Default is None, which uses the uniform
+        table.
+    chunksize : int, optional
+        Number of rows of the file to read at a time. The interpolation tables are
+        built up chunk by chunk, so peak memory is bounded by the chunk size rather
+        than the size of the file. Default is 10**6.
+    """
+    if cache is None:
+        cs_interp, Ts, data_interp = _read_aem_csv(filename, chunksize)
+    else:
+        key = bpp.cache.fingerprint(
+            (bpp.cache.file_fingerprint(filename), _AEM_PARAMETERS)
+        )
+        tables = os.path.join(cache, f"aem-{key}.npz")
+        if os.path.exists(tables):
+            with np.load(tables) as f:
+                cs_interp, Ts, data_interp = f["cs"], f["Ts"], f["data"]
+        else:
+            cs_interp, Ts, data_interp = _read_aem_csv(filename, chunksize)
+            os.makedirs(cache, exist_ok=True)
+            buffer = io.BytesIO()
+            np.savez(buffer, cs=cs_interp, Ts=Ts, data=data_interp)
+            bpp.cache._atomic_write(tables, buffer.getvalue())
 
     # Get electrolyte parameters from data
     c_e = 1000
@@ -35,18 +215,29 @@ def advanced_electrolyte_model(filename):
         "Initial concentration in electrolyte [mol.m-3]": c_e,
         "1 + dlnf/dlnc": 1,
     }
-    for pybamm_name, aem_name, conversion_factor in [
-        ("Electrolyte conductivity [S.m-1]", "Cond (mS) 2", 0.1),
-        ("Cation transference number", "t+(a)", 1),
-        ("Electrolyte diffusivity [m2.s-1]", "Diff. Coeff. cm^2/s", 1e-4),
-    ]:
-        cs_interp, Ts, data_interp = _get_2d_mesh_data(aem_data, aem_name)
 
+    # The grids in SI units are shared by the properties on the uniform grid, and
+    # with a cache all the tables are mapped from files in it, so that parameter
+    # values pickled to other processes only refer to them
+    def share(array):
+        return array if cache is None else bpp.cache.shared_array(array, cache)
+
+    cs_si = share(cs_interp * 1000)
+    Ts_si = share(Ts + 273.15)
+    for i, (pybamm_name, _, conversion_factor) in enumerate(_AEM_PARAMETERS):
+        data = data_interp[:, :, i]
+        knots = None
+        if isinstance(rtol, dict):
+            if pybamm_name in rtol:
+                knots = _adaptive_knots(cs_interp, data, rtol[pybamm_name])
+        elif rtol is not None:
+            knots = _adaptive_knots(cs_interp, data, rtol)
+        if knots is None:
+            cs, data = cs_si, conversion_factor * data
+        else:
+            cs, data = share(cs_si[knots]), conversion_factor * data[knots]
         electrolyte_parameters[pybamm_name] = partial(
-            _pybamm_interp,
-            cs_interp * 1000,
-            Ts + 273.15,
-            conversion_factor * data_interp.T,
+            _pybamm_interp, cs, Ts_si, share(data)
         )
 
     source = (
@@ -1,15 +1,68 @@
+import numpy as np
 import battery_param_pipeline as bpp
 
 
+def _is_distribution(value):
+    return hasattr(value, "rvs") and hasattr(value, "mean")
+
+
 class DirectEntry(bpp.pipeline._PipelineElement):
+    """
+    Parameters entered directly, e.g. from a datasheet or a paper.
+
+    Uncertain parameters can be given as distributions, i.e. objects with `rvs`
+    and `mean` methods such as frozen :mod:`scipy.stats` distributions. Their mean
+    is used when the pipeline is run, and they are sampled by
+    :meth:`Pipeline.run_monte_carlo`.
+    """
+
+    # Direct entries are cheaper to rerun than to load from the cache
+    _cacheable = False
+
     def __init__(self, parameters, source):
         super().__init__(source)
         self._parameters = parameters
         self._type = "direct entry"
+        self.input_keys = []
+        self.output_keys = list(parameters)
 
     def run(self, parameter_values):
         # ignores the parameter values but provided for consistent interface
-        return self._parameters.copy()
+        return {
+            k: v.mean() if _is_distribution(v) else v
+            for k, v in self._parameters.items()
+        }
+
+    def sample(self, n_samples, random_state=None):
+        """
+        Return the parameters, with `n_samples` samples of each distribution.
+
+        Parameters
+        ----------
+        n_samples : int
+            Number of samples
+        random_state : :class:`numpy.random.Generator`, optional
+            Random number generator to sample with
+
+        Returns
+        -------
+        dict
+            The parameters, with arrays of samples in place of the distributions
+        """
+        return {
+            k: (
+                np.asarray(v.rvs(size=n_samples, random_state=random_state), float)
+                if _is_distribution(v)
+                else v
+            )
+            for k, v in self._parameters.items()
+        }
+
+    def _generate_latex(self):
+        # show the distributions rather than their means
+        report = self._source + "\n\n"
+        report += bpp.latex.parameter_dict_to_table(self._parameters)
+        return report
 
 
 def standard_defaults():
@@ -0,0 +1,64 @@
+import inspect
+import weakref
+import numpy as np
+import pybamm
+
+# Compiled functions, keyed by the function-valued parameter they were compiled from
+_compiled = weakref.WeakKeyDictionary()
+
+
+def compile_function(function):
+    """
+    Return a vectorized NumPy version of a function-valued parameter (e.g. an OCP or
+    an electrolyte property), which can be called with arrays of any (broadcastable)
+    shapes and returns an array.
+
+    The pybamm expression tree of the function is only built once, with one state
+    vector entry per argument, and evaluating it on arrays is then a single pass
+    over the tree with NumPy operations. Compiled functions are memoized by function
+    object, so that calculations and plots using the same parameter share them.
+    Scalar arguments give a scalar result.
+
+    Parameters
+    ----------
+    function : callable or tuple
+        Function-valued parameter, taking and returning pybamm symbols, or data in
+        pybamm's tabulated form `(name, (x, y))`, which is interpolated linearly
+    """
+    try:
+        return _compiled[function]
+    except (KeyError, TypeError):
+        pass
+
+    if isinstance(function, tuple):
+        name, (x, y) = function
+        n_args = len(x) if isinstance(x, (list, tuple)) else 1
+        children = [pybamm.StateVector(slice(i, i + 1)) for i in range(n_args)]
+        expression = pybamm.Interpolant(x, y, children, name=name)
+    else:
+        n_args = len(inspect.signature(function).parameters)
+        children = [pybamm.StateVector(slice(i, i + 1)) for i in range(n_args)]
+        expression = function(*children)
+
+    def evaluate(*args):
+        args = np.broadcast_arrays(*[np.asarray(arg, dtype=float) for arg in args])
+        shape = args[0].shape if args else ()
+        if isinstance(expression, pybamm.Symbol):
+            y = np.vstack([arg.reshape(1, -1) for arg in args])
+            out = expression.evaluate(y=y)
+            # one value per column of y (as a row, or a column for interpolants),
+            # or a constant
+            out = np.asarray(out)
+            if out.size != y.shape[1]:
+                out = np.broadcast_to(out, (1, y.shape[1]))
+            out = out.reshape(shape)
+        else:
+            out = np.full(shape, float(expression))
+        return out[()]
+
+    try:
+        _compiled[function] = evaluate
+    except TypeError:
+        # not weak-referenceable, so cannot be memoized
+        pass
+    return evaluate
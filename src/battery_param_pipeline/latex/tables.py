@@ -1,4 +1,5 @@
 import inspect
+import numpy as np
 
 
 def parameter_dict_to_table(d):
@@ -25,9 +26,16 @@ def parameter_dict_to_table(d):
                 functions.append("\n".join(function))
             except TypeError:
                 pass
+        elif hasattr(value, "rvs") and hasattr(value, "mean"):
+            # uncertain values: give the mean and standard deviation
+            value = f"{value.mean():.4g} $\\pm$ {value.std():.4g}"
+            table.append("\t" + r"{} & {} \\".format(key, value))
+        elif isinstance(value, np.ndarray) and value.ndim > 0:
+            # batched values: give the range
+            value = f"{value.min():.4g} -- {value.max():.4g}"
+            table.append("\t" + r"{} & {} \\".format(key, value))
         else:
             # default to 4 significant figures for now
-            # TODO: track uncertainty and use that
             table.append("\t" + r"{} & {} \\".format(key, f"{value:.4g}"))
 
     table += [r"\bottomrule", r"\end{tabular}", r"\end{center}"]
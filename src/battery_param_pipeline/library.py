@@ -0,0 +1,170 @@
+import collections.abc
+import contextlib
+import json
+import os
+import sqlite3
+import battery_param_pipeline as bpp
+
+
+class ParameterLibrary:
+    """
+    On-disk library of named parameter sets.
+
+    Each parameter set is stored in its own directory with
+    :func:`battery_param_pipeline.storage.save_parameters`, and indexed by name
+    (with its source and the names of its parameters) in an SQLite database,
+    `index.sqlite`. Looking up a set only reads its row of the index, and only the
+    parameters of that set are loaded, with array data memory-mapped so that
+    processes using the same set share one copy of it.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the library. It is created if it does not exist.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "sets"), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS parameter_sets ("
+                "name TEXT PRIMARY KEY, source TEXT, directory TEXT, keys TEXT)"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(os.path.join(self.directory, "index.sqlite"))
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def add(self, name, parameters, source=None):
+        """
+        Store a parameter set in the library, replacing any set with the same name.
+
+        Parameters
+        ----------
+        name : str
+            Name of the parameter set
+        parameters : dict or :class:`~battery_param_pipeline.direct_entries.DirectEntry`
+            Parameter values. Distributions are stored as they are.
+        source : str, optional
+            Source for the report. Default is the source of the direct entry, or
+            the name of the set.
+        """
+        if isinstance(parameters, bpp.direct_entries.DirectEntry):
+            source = source or parameters.source
+            parameters = parameters._parameters
+        source = source or name
+        directory = bpp.cache.fingerprint(name)[:32]
+        bpp.storage.save_parameters(
+            parameters, os.path.join(self.directory, "sets", directory)
+        )
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO parameter_sets VALUES (?, ?, ?, ?)",
+                (name, source, directory, json.dumps(list(parameters))),
+            )
+
+    def _row(self, name):
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT source, directory, keys FROM parameter_sets WHERE name = ?",
+                (name,),
+            ).fetchone()
+        if row is None:
+            raise ValueError(f"No parameter set '{name}' in the library")
+        source, directory, keys = row
+        return source, os.path.join(self.directory, "sets", directory), keys
+
+    def names(self):
+        """Return the names of the parameter sets in the library, in sorted order."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT name FROM parameter_sets ORDER BY name"
+            ).fetchall()
+        return [name for name, in rows]
+
+    def __contains__(self, name):
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT 1 FROM parameter_sets WHERE name = ?", (name,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._connect() as connection:
+            (count,) = connection.execute(
+                "SELECT COUNT(*) FROM parameter_sets"
+            ).fetchone()
+        return count
+
+    def load(self, name, mmap=True):
+        """
+        Load the values of a parameter set.
+
+        Parameters
+        ----------
+        name : str
+            Name of the parameter set
+        mmap : bool, optional
+            Whether to memory-map array data rather than reading it into memory.
+            Default is True.
+
+        Returns
+        -------
+        dict
+            The parameter values
+        """
+        _, directory, _ = self._row(name)
+        return bpp.storage.load_parameters(directory, mmap=mmap)
+
+    def entry(self, name):
+        """
+        Return a direct entry of a parameter set. Its parameter names come from the
+        index, and the values are only loaded when they are first used.
+
+        Parameters
+        ----------
+        name : str
+            Name of the parameter set
+
+        Returns
+        -------
+        :class:`battery_param_pipeline.direct_entries.DirectEntry`
+            The parameter set
+        """
+        source, directory, keys = self._row(name)
+        parameters = _LazyParameters(directory, json.loads(keys))
+        return bpp.direct_entries.DirectEntry(parameters, source)
+
+
+class _LazyParameters(collections.abc.Mapping):
+    # Parameter values of a set in the library, loaded on first access. Only the
+    # location of the set is pickled, so processes that receive it load (and
+    # memory-map) it themselves.
+
+    def __init__(self, directory, keys):
+        self.directory = directory
+        self._keys = keys
+        self._values = None
+
+    def _load(self):
+        if self._values is None:
+            self._values = bpp.storage.load_parameters(self.directory)
+        return self._values
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getstate__(self):
+        return {"directory": self.directory, "_keys": self._keys, "_values": None}
@@ -1,14 +1,36 @@
 import pybamm
+import asyncio
 import collections
+import concurrent.futures
+import inspect
 import json
+import numbers
+import numpy as np
 import os
+import pandas as pd
+import threading
+import time
+import tracemalloc
+import warnings
 import battery_param_pipeline as bpp
 
 
 class _PipelineElement:
+    # Parameter keys read and written by the element. `None` means that they are
+    # not known in advance, in which case they are recorded when the element is
+    # first run as part of a pipeline
+    input_keys = None
+    output_keys = None
+    # Whether the outputs are worth storing in the component cache
+    _cacheable = True
+
     def __init__(self, source):
         self._source = source
 
+    @property
+    def source(self):
+        return self._source
+
     def serialize(self, parameters):
         serialized = {}
         for k, v in parameters.items():
@@ -17,18 +39,32 @@ class _PipelineElement:
                     v = v.__name__
                 except AttributeError:
                     v = "partial"
+            elif isinstance(v, np.ndarray):
+                # summarize batched values rather than writing every entry
+                v = np.array2string(v, threshold=10)
             else:
                 v = str(v)
             serialized[k] = v
         return serialized
 
-    def _generate_report(self, parameter_values):
+    def count(self, counter, increment=1):
+        """
+        Increment a counter (e.g. number of solver calls or optimizer iterations),
+        which is recorded in the report when the pipeline is profiled.
+        """
+        counters = self.__dict__.get("_counters")
+        if counters is not None:
+            counters[counter] = counters.get(counter, 0) + increment
+
+    def _generate_report(self, parameter_values, profile=None):
         self.parameters_ = parameter_values
         self.report_ = {
             "source": self._source,
             "type": self._type,
             "parameters": self.serialize(parameter_values),
         }
+        if profile is not None:
+            self.report_["profile"] = profile
 
     def _generate_latex(self):
         report = self._source + "\n\n"
@@ -39,17 +75,300 @@ class _PipelineElement:
 class _ReadOnlyDict(collections.abc.Mapping):
     def __init__(self, data):
         self._data = data
+        # Number of times parameters have been added with `_update`
+        self.version = 0
+        # Shared pybamm.ParameterValues, brought up to date when requested
+        self._pybamm_parameter_values = None
+        self._keys = list(data)
+        self._n_synced = 0
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def _update(self, new_params):
+        _check_duplicates(self._data, new_params)
+        self._data.update(new_params)
+        self._keys.extend(new_params)
+        self.version += 1
+
+    def to_pybamm(self, updates=None):
+        """
+        Return the parameter values as a :class:`pybamm.ParameterValues`.
+
+        The same object is shared by all the components of a pipeline, and only
+        the parameters added since it was last requested are added to it, so it
+        must not be modified. To modify it, pass `updates`, in which case a
+        modified copy is returned instead (copy-on-write).
+        """
+        if self._pybamm_parameter_values is None:
+            self._pybamm_parameter_values = pybamm.ParameterValues({})
+        if self._n_synced < len(self._keys):
+            self._pybamm_parameter_values.update(
+                {k: self._data[k] for k in self._keys[self._n_synced :]},
+                check_already_exists=False,
+            )
+            self._n_synced = len(self._keys)
+        if updates is None:
+            return self._pybamm_parameter_values
+        parameter_values = self._pybamm_parameter_values.copy()
+        parameter_values.update(updates, check_already_exists=False)
+        return parameter_values
+
+
+class _RecordingDict(_ReadOnlyDict):
+    """
+    Read-only view of the parameter values that records which keys a component
+    reads. Iterating over the view, or accessing the underlying dictionary,
+    counts as reading every key.
+    """
+
+    def __init__(self, data):
+        self._raw_data = data
+        self.keys_read = set()
+        self.read_all = False
+
+    @property
+    def _data(self):
+        self.read_all = True
+        return getattr(self._raw_data, "_data", self._raw_data)
 
     def __getitem__(self, key):
+        self.keys_read.add(key)
+        return self._raw_data[key]
+
+    def __len__(self):
+        return len(self._raw_data)
+
+    def __iter__(self):
+        self.read_all = True
+        return iter(self._raw_data)
+
+    def to_pybamm(self, updates=None):
+        self.read_all = True
+        if isinstance(self._raw_data, _ReadOnlyDict):
+            return self._raw_data.to_pybamm(updates)
+        parameter_values = pybamm.ParameterValues(dict(self._raw_data))
+        if updates is not None:
+            parameter_values.update(updates, check_already_exists=False)
+        return parameter_values
+
+
+class _LazyParameterValues(collections.abc.Mapping):
+    """
+    Parameter values of a pipeline in which each parameter is only computed when it
+    is first accessed, by running the components that generate it (and, in turn,
+    the components that generate the parameters those read).
+    """
+
+    def __init__(self, pipeline):
+        self._components = [component for _, component in pipeline.named_components]
+        self._component_cache = pipeline._component_cache()
+        self._data = {}
+        # index of the component that generated each parameter
+        self._producers = {}
+        self._has_run = set()
+
+    def _get(self, key, stop):
+        """Get a parameter generated by one of the first `stop` components."""
+        if key not in self._producers:
+            # Run the component that generates the key if it is known, otherwise
+            # the components whose outputs are unknown, in order, until it is found
+            candidates = [
+                i
+                for i, component in enumerate(self._components[:stop])
+                if component.output_keys is not None and key in component.output_keys
+            ] or [
+                i
+                for i, component in enumerate(self._components[:stop])
+                if component.output_keys is None
+            ]
+            for i in candidates:
+                self._run(i)
+                if key in self._producers:
+                    break
+        if self._producers.get(key, stop) >= stop:
+            raise KeyError(key)
         return self._data[key]
 
+    def _run(self, i):
+        if i in self._has_run:
+            return
+        self._has_run.add(i)
+        component = self._components[i]
+        new_params, keys_read = _run_component(
+            component, _LazyView(self, i), self._component_cache
+        )
+        component._generate_report(new_params)
+        _check_duplicates(self._data, new_params)
+        self._data.update(new_params)
+        self._producers.update({k: i for k in new_params})
+        _record_keys(component, new_params, keys_read)
+
+    def _run_all(self, stop):
+        for i in range(stop):
+            self._run(i)
+
+    def __getitem__(self, key):
+        return self._get(key, len(self._components))
+
     def __len__(self):
+        self._run_all(len(self._components))
         return len(self._data)
 
     def __iter__(self):
+        self._run_all(len(self._components))
         return iter(self._data)
 
 
+class _LazyView(collections.abc.Mapping):
+    """
+    View of lazy parameter values that is passed to a component, giving access to
+    the parameters generated by the components before it.
+    """
+
+    def __init__(self, lazy_parameter_values, stop):
+        self._lazy = lazy_parameter_values
+        self._stop = stop
+
+    def __getitem__(self, key):
+        return self._lazy._get(key, self._stop)
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __iter__(self):
+        self._lazy._run_all(self._stop)
+        return (k for k, i in self._lazy._producers.items() if i < self._stop)
+
+
+def _run_component(component, parameter_values, cache=None):
+    # Module-level so that it can be sent to a process pool
+    if cache is not None and component._cacheable:
+        cached = cache.load(component, parameter_values)
+        if cached is not None:
+            return cached
+
+    recorder = _RecordingDict(parameter_values)
+    new_params = component.run(recorder)
+    keys_read = None if recorder.read_all else recorder.keys_read
+
+    if cache is not None and component._cacheable:
+        cache.save(component, parameter_values, new_params, keys_read)
+    return new_params, keys_read
+
+
+def batch_size(parameter_values):
+    """
+    Return the size of the leading batch dimension of array-valued parameters, or
+    None if all the parameters are scalars (or functions).
+    """
+    sizes = {
+        k: v.shape[0]
+        for k, v in parameter_values.items()
+        if isinstance(v, np.ndarray) and v.ndim > 0
+    }
+    if len(set(sizes.values())) > 1:
+        raise ValueError(
+            "Inconsistent batch sizes in parameter values: {}".format(sizes)
+        )
+    return next(iter(sizes.values()), None)
+
+
+def split_batch(parameter_values):
+    """
+    Split batched parameter values into one :class:`pybamm.ParameterValues` per
+    entry of the batch. Scalar and function-valued parameters are shared by all
+    the entries.
+    """
+    n = batch_size(parameter_values)
+    if n is None:
+        return [pybamm.ParameterValues(dict(parameter_values))]
+    batched = {
+        k
+        for k, v in parameter_values.items()
+        if isinstance(v, np.ndarray) and v.ndim > 0
+    }
+    return [
+        pybamm.ParameterValues(
+            {k: v[i] if k in batched else v for k, v in parameter_values.items()}
+        )
+        for i in range(n)
+    ]
+
+
+def _check_duplicates(parameter_values, new_params):
+    duplicate_keys = [p for p in new_params if p in parameter_values]
+    if any(duplicate_keys):
+        raise ValueError(
+            "Parameter '{}' already exists in parameter values".format(
+                duplicate_keys[0]
+            )
+        )
+
+
+def _record_keys(component, new_params, keys_read):
+    # Record the keys read and written, for components that do not declare them
+    if component.input_keys is None and keys_read is not None:
+        component.input_keys = sorted(keys_read)
+    if component.output_keys is None:
+        component.output_keys = list(new_params)
+
+
+def _profile_component(component, parameter_values, cache=None):
+    # Same as `_run_component`, also returning a profile of the component
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        # e.g. in a worker process
+        tracemalloc.start()
+    memory_start = tracemalloc.get_traced_memory()[0]
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    component._counters = {}
+    start = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+
+    new_params, keys_read = _run_component(component, parameter_values, cache)
+
+    cpu_time = time.thread_time() - cpu_start
+    wall_time = time.perf_counter() - wall_start
+    memory_peak = tracemalloc.get_traced_memory()[1]
+    if not tracing:
+        tracemalloc.stop()
+    profile = {
+        "start [s]": start,
+        "wall time [s]": wall_time,
+        "CPU time [s]": cpu_time,
+        "peak memory increase [B]": max(memory_peak - memory_start, 0),
+        "counters": component.__dict__.pop("_counters"),
+        "process": os.getpid(),
+        "thread": threading.get_ident(),
+    }
+    return new_params, keys_read, profile
+
+
+async def _arun_component(component, parameter_values, cache=None):
+    # Same as `_run_component`, for components with an async `run` method
+    if cache is not None and component._cacheable:
+        cached = cache.load(component, parameter_values)
+        if cached is not None:
+            return cached
+
+    recorder = _RecordingDict(parameter_values)
+    new_params = await component.run(recorder)
+    keys_read = None if recorder.read_all else recorder.keys_read
+
+    if cache is not None and component._cacheable:
+        cache.save(component, parameter_values, new_params, keys_read)
+    return new_params, keys_read
+
+
 class Pipeline:
     def __init__(self, named_components, cache=None):
         self.named_components = named_components
@@ -62,30 +381,593 @@ class Pipeline:
     def cache(self):
         return self._cache
 
-    def run(self):
+    def run(self, executor=None, profile=False):
+        """
+        Run all the components of the pipeline and collect their parameters.
+
+        Parameters can be NumPy arrays with a leading batch dimension, for example
+        to evaluate many electrode designs at once. The built-in calculations
+        broadcast over the batch, and the result can be split into one set of
+        parameter values per entry with :func:`split_batch`.
+
+        If the pipeline has a cache directory, the outputs of each component are
+        stored there under a fingerprint of the component's source code, its
+        constructor arguments and the parameter values it reads. Components for
+        which all of these are unchanged are loaded from the cache instead of
+        being run again.
+
+        Parameters
+        ----------
+        executor : :class:`concurrent.futures.Executor`, optional
+            If given, components that do not depend on each other are run
+            concurrently on the executor (a thread or process pool). Dependencies
+            are found from the `input_keys` and `output_keys` of each component;
+            components that do not declare them are treated as depending on all
+            previous components until they have been run once and their keys have
+            been recorded. Default is None, which runs the components in order.
+        profile : bool, optional
+            Whether to record the wall time, CPU time, peak memory increase and
+            counters (see :meth:`_PipelineElement.count`) of each component under
+            "profile" in its report. The profile can then be exported with
+            :meth:`export_profile`. When components run concurrently in threads,
+            the memory of each includes that of the others. Default is False.
+
+        Returns
+        -------
+        :class:`pybamm.ParameterValues`
+            The parameter values generated by the pipeline
+        """
         parameter_values = _ReadOnlyDict({})
-        report = {}
-        for named_component in self.named_components:
-            name, component = named_component
-            new_params = component.run(parameter_values)
-            component._generate_report(new_params)
-            report[name] = component.report_
-            duplicate_keys = [p for p in new_params if p in parameter_values]
-            if any(duplicate_keys):
-                raise ValueError(
-                    "Parameter '{}' already exists in parameter values".format(
-                        duplicate_keys[0]
+        reports = {}
+        run_component = _profile_component if profile else _run_component
+        tracing = tracemalloc.is_tracing()
+        if profile and not tracing:
+            tracemalloc.start()
+        run_start = time.time()
+        try:
+            if executor is None:
+                for named_component in self.named_components:
+                    _, component = named_component
+                    result = run_component(
+                        component, parameter_values, self._component_cache()
                     )
+                    self._add_parameters(
+                        parameter_values, reports, named_component, *result
+                    )
+            else:
+                self._run_graph(executor, run_component, parameter_values, reports)
+        finally:
+            if profile and not tracing:
+                tracemalloc.stop()
+
+        if profile:
+            # Start times relative to the start of the run
+            for report in reports.values():
+                report["profile"]["start [s]"] -= run_start
+        return self._finish_run(parameter_values, reports)
+
+    async def arun(self, executor=None):
+        """
+        Run the pipeline from asyncio, without blocking the event loop.
+
+        Components whose `run` method is a coroutine function (`async def run`) are
+        awaited, and other components are run in `executor`. As in :meth:`run`
+        with an executor, components that do not depend on each other run
+        concurrently, so I/O-bound components (e.g. database queries) overlap with
+        CPU-bound ones.
+
+        Parameters
+        ----------
+        executor : :class:`concurrent.futures.Executor`, optional
+            Executor for the synchronous components. Default is None, which uses
+            the event loop's default executor.
+
+        Returns
+        -------
+        :class:`pybamm.ParameterValues`
+            The parameter values generated by the pipeline
+        """
+        loop = asyncio.get_running_loop()
+        parameter_values = _ReadOnlyDict({})
+        reports = {}
+        cache = self._component_cache()
+        tasks = []
+
+        async def run_component(i, dependencies):
+            await asyncio.gather(*(tasks[j] for j in dependencies))
+            _, component = self.named_components[i]
+            # Other components add parameters while this one is running
+            snapshot = dict(parameter_values._data)
+            if inspect.iscoroutinefunction(component.run):
+                result = await _arun_component(component, snapshot, cache)
+            else:
+                result = await loop.run_in_executor(
+                    executor, _run_component, component, snapshot, cache
                 )
-            parameter_values._data.update(new_params)
+            self._add_parameters(
+                parameter_values, reports, self.named_components[i], *result
+            )
+
+        for i, dependencies in enumerate(self._dependencies()):
+            tasks.append(asyncio.ensure_future(run_component(i, dependencies)))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
 
-        self.report_ = report
+        return self._finish_run(parameter_values, reports)
+
+    def _finish_run(self, parameter_values, reports):
+        # Keep the report in the same order as the components
+        self.report_ = {name: reports[name] for name, _ in self.named_components}
 
         if self.cache is not None:
-            self._save_cache()
+            self._save_cache(parameter_values._data)
+
+        return parameter_values.to_pybamm()
+
+    def run_many(self, variants, executor=None):
+        """
+        Run the pipeline for many variants of the parameters.
+
+        Each variant overrides some parameters. An overridden parameter replaces the
+        value generated by the component that generates it, so all the components
+        before the first one whose outputs differ between variants are only run
+        once, and shared by all the variants. The pipeline then branches each time
+        the variants diverge.
+
+        Reports are not generated for the components when running many variants.
+
+        Parameters
+        ----------
+        variants : list of dict
+            Parameter values to override, for each variant
+        executor : :class:`concurrent.futures.Executor`, optional
+            If given, the branches of the pipeline are run concurrently on the
+            executor (a thread or process pool). Default is None, which runs the
+            branches one after the other.
+
+        Returns
+        -------
+        table : :class:`pandas.DataFrame`
+            Table of all the scalar parameters, with one row per variant
+        parameter_values : list of :class:`pybamm.ParameterValues`
+            The parameter values generated by the pipeline, for each variant
+        """
+        cache = self._component_cache()
+
+        # Each branch is a dictionary of parameter values shared by a group of
+        # variants
+        branches = [({}, list(range(len(variants))))]
+        for _, component in self.named_components:
+            datas = [data for data, _ in branches]
+            if executor is None:
+                results = [_run_component(component, data, cache) for data in datas]
+            else:
+                n = len(datas)
+                results = executor.map(
+                    _run_component, [component] * n, datas, [cache] * n
+                )
+
+            new_branches = []
+            for (data, indices), (new_params, keys_read) in zip(branches, results):
+                _check_duplicates(data, new_params)
+                _record_keys(component, new_params, keys_read)
+
+                groups = {}
+                for i in indices:
+                    overrides = {
+                        k: v for k, v in variants[i].items() if k in new_params
+                    }
+                    key = bpp.cache.fingerprint(overrides)
+                    groups.setdefault(key, (overrides, []))[1].append(i)
+                for overrides, group in groups.values():
+                    new_data = data if len(groups) == 1 else data.copy()
+                    new_data.update(new_params)
+                    new_data.update(overrides)
+                    new_branches.append((new_data, group))
+            branches = new_branches
+
+        parameter_values = [None] * len(variants)
+        for data, indices in branches:
+            for i in indices:
+                parameter_values[i] = data
+
+        for i, variant in enumerate(variants):
+            for k in variant:
+                if k not in parameter_values[i]:
+                    raise ValueError(
+                        f"Parameter '{k}' is not generated by any component"
+                    )
+
+        columns = []
+        if variants:
+            columns = [
+                k
+                for k, v in parameter_values[0].items()
+                if isinstance(v, numbers.Number)
+            ]
+        table = pd.DataFrame(
+            [[data[k] for k in columns] for data in parameter_values],
+            columns=columns,
+        )
+        parameter_values = [pybamm.ParameterValues(data) for data in parameter_values]
+        return table, parameter_values
+
+    def run_monte_carlo(self, n_samples, seed=None, percentiles=(2.5, 50, 97.5)):
+        """
+        Propagate the uncertainty of the direct entries given as distributions (see
+        :class:`bpp.direct_entries.DirectEntry`) through the pipeline.
+
+        All the samples are run at once as a batch (see :meth:`run`), so the
+        calculations only run once, on arrays of `n_samples` entries. Reports are
+        not generated for the components.
+
+        Parameters
+        ----------
+        n_samples : int
+            Number of samples
+        seed : int, optional
+            Seed for the random number generator
+        percentiles : tuple of float, optional
+            Percentiles to report. Default is (2.5, 50, 97.5).
+
+        Returns
+        -------
+        summary : :class:`pandas.DataFrame`
+            Mean, standard deviation and percentiles of each uncertain parameter,
+            with one row per parameter
+        correlation : :class:`pandas.DataFrame`
+            Correlation matrix of the uncertain parameters that vary
+        parameter_values : :class:`pybamm.ParameterValues`
+            The parameter values generated by the pipeline, with arrays of samples
+            for the uncertain parameters
+        """
+        rng = np.random.default_rng(seed)
+        cache = self._component_cache()
+        data = {}
+        for _, component in self.named_components:
+            if isinstance(component, bpp.direct_entries.DirectEntry):
+                new_params, keys_read = component.sample(n_samples, rng), set()
+            else:
+                new_params, keys_read = _run_component(component, data, cache)
+            _check_duplicates(data, new_params)
+            _record_keys(component, new_params, keys_read)
+            data.update(new_params)
+
+        keys = [
+            k
+            for k, v in data.items()
+            if isinstance(v, np.ndarray) and v.shape == (n_samples,)
+        ]
+        samples = np.array([data[k] for k in keys], dtype=float).reshape(
+            len(keys), n_samples
+        )
+        summary = pd.DataFrame(
+            {"mean": samples.mean(axis=1), "std": samples.std(axis=1)}, index=keys
+        )
+        for p, values in zip(percentiles, np.percentile(samples, percentiles, axis=1)):
+            summary[f"{p:g}%"] = values
+
+        # outputs that only vary by rounding errors are constant
+        scale = np.maximum(np.abs(summary["mean"].to_numpy()), np.finfo(float).tiny)
+        varying = summary["std"].to_numpy() > 1e-12 * scale
+        correlation = pd.DataFrame(
+            np.corrcoef(samples[varying]).reshape(varying.sum(), varying.sum()),
+            index=summary.index[varying],
+            columns=summary.index[varying],
+        )
+        return summary, correlation, pybamm.ParameterValues(data)
 
-        return pybamm.ParameterValues(parameter_values._data)
+    def sensitivities(self, inputs=None):
+        """
+        Return the Jacobian of the parameters derived by the calculations with
+        respect to the scalar direct entries, in a single run of the pipeline.
 
-    def _save_cache(self):
+        The derivatives are computed in forward mode by complex-step
+        differentiation: each input is given an imaginary perturbation along its
+        own entry of a batch (see :meth:`run`), so the derivatives with respect to
+        all the inputs are propagated at once, and are exact to machine precision.
+        This requires the calculations to be written with NumPy arithmetic on
+        their inputs, as the built-in ones are; calculations that convert their
+        inputs to real numbers (e.g. compiled functions or root-finding) cannot be
+        differentiated.
+
+        Parameters
+        ----------
+        inputs : list of str, optional
+            Direct entries to differentiate with respect to. Default is None, which
+            uses all the scalar direct entries.
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Jacobian, with one row per derived scalar parameter and one column per
+            input
+        """
+        entries = {}
+        for _, component in self.named_components:
+            if isinstance(component, bpp.direct_entries.DirectEntry):
+                entries.update(component.run({}))
+        if inputs is None:
+            inputs = [
+                k
+                for k, v in entries.items()
+                if isinstance(v, numbers.Real) and not isinstance(v, bool)
+            ]
+        for k in inputs:
+            if not isinstance(entries.get(k), numbers.Real):
+                raise ValueError(f"Parameter '{k}' is not a scalar direct entry")
+
+        # relative steps, small enough for the truncation error to vanish
+        steps = np.array([1e-20 * (abs(entries[k]) or 1) for k in inputs])
+        seeds = {
+            k: entries[k] + 1j * steps[i] * (np.arange(len(inputs)) == i)
+            for i, k in enumerate(inputs)
+        }
+
+        data = {}
+        derived = []
+        for name, component in self.named_components:
+            if isinstance(component, bpp.direct_entries.DirectEntry):
+                new_params = {
+                    k: seeds.get(k, v) for k, v in component.run(data).items()
+                }
+            else:
+                try:
+                    with warnings.catch_warnings():
+                        # discarding the imaginary part would lose the derivatives
+                        warnings.simplefilter("error", np.exceptions.ComplexWarning)
+                        new_params, _ = _run_component(component, data)
+                except Exception as e:
+                    raise ValueError(
+                        f"Component '{name}' cannot be differentiated: {e}"
+                    ) from e
+                derived += [
+                    k
+                    for k, v in new_params.items()
+                    if isinstance(v, numbers.Number)
+                    or (isinstance(v, np.ndarray) and v.shape == (len(inputs),))
+                ]
+            _check_duplicates(data, new_params)
+            data.update(new_params)
+
+        jacobian = [
+            np.broadcast_to(np.imag(data[k]), (len(inputs),)) / steps for k in derived
+        ]
+        return pd.DataFrame(
+            np.reshape(jacobian, (len(derived), len(inputs))),
+            index=derived,
+            columns=inputs,
+        )
+
+    def compile(self, inputs, outputs):
+        """
+        Compile the pipeline into a function of some of the direct entries, e.g.
+        for an outer optimization loop.
+
+        The pipeline is run once, and everything that does not depend on the
+        inputs is kept fixed. The function then only runs the calculations that
+        depend on the inputs and are needed for the outputs, without generating
+        reports, caching or creating :class:`pybamm.ParameterValues`.
+
+        Parameters
+        ----------
+        inputs : list of str
+            Direct entries that are arguments of the function. Their values can be
+            arrays (see :meth:`run`).
+        outputs : list of str
+            Parameters returned by the function
+
+        Returns
+        -------
+        callable
+            Function taking the values of the inputs, in order, and returning a
+            tuple of the values of the outputs
+        """
+        cache = self._component_cache()
+        components = [component for _, component in self.named_components]
+        data = {}
+        producers = {}
+        for i, component in enumerate(components):
+            new_params, keys_read = _run_component(component, data, cache)
+            _check_duplicates(data, new_params)
+            _record_keys(component, new_params, keys_read)
+            data.update(new_params)
+            producers.update({k: i for k in new_params})
+
+        for k in list(inputs) + list(outputs):
+            if k not in producers:
+                raise ValueError(f"Parameter '{k}' is not generated by any component")
+        for k in inputs:
+            if not isinstance(components[producers[k]], bpp.direct_entries.DirectEntry):
+                raise ValueError(f"Parameter '{k}' is not a direct entry")
+
+        # Calculations whose outputs change with the inputs
+        changed = set(inputs)
+        dynamic = []
+        for component in components:
+            if isinstance(component, bpp.direct_entries.DirectEntry):
+                continue
+            if component.input_keys is None or not changed.isdisjoint(
+                component.input_keys
+            ):
+                dynamic.append(component)
+                changed.update(component.output_keys)
+
+        # ... of which only the ones the outputs depend on are run
+        needed = set(outputs)
+        steps = []
+        for component in reversed(dynamic):
+            if needed.isdisjoint(component.output_keys):
+                continue
+            steps.insert(0, component)
+            needed.update(
+                data if component.input_keys is None else component.input_keys
+            )
+
+        recomputed = set(inputs).union(*(component.output_keys for component in steps))
+        fixed = {k: v for k, v in data.items() if k not in recomputed}
+        runs = [component.run for component in steps]
+
+        def compiled(*values):
+            parameter_values = _ReadOnlyDict(fixed.copy())
+            parameter_values._update(dict(zip(inputs, values)))
+            for run in runs:
+                parameter_values._update(run(parameter_values))
+            return tuple(parameter_values._data[k] for k in outputs)
+
+        return compiled
+
+    def run_lazy(self):
+        """
+        Return the parameter values of the pipeline without running it. Each
+        parameter is computed when it is first accessed, by running only the
+        components needed to generate it, and then memoized.
+
+        Components that do not declare their `output_keys` are run in order until
+        the parameter is found, unless their keys have been recorded by a
+        previous run. Iterating over the parameter values runs every component.
+
+        Returns
+        -------
+        :class:`collections.abc.Mapping`
+            Lazily evaluated parameter values
+        """
+        return _LazyParameterValues(self)
+
+    def _dependencies(self):
+        """
+        Return, for each component, the indices of the previous components it
+        depends on, based on the parameter keys that the components read and write.
+        """
+        components = [component for _, component in self.named_components]
+        dependencies = []
+        for i, component in enumerate(components):
+            if component.input_keys is None:
+                dependencies.append(set(range(i)))
+                continue
+            inputs = set(component.input_keys)
+            dependencies.append(
+                {
+                    j
+                    for j, previous in enumerate(components[:i])
+                    if previous.output_keys is None
+                    or not inputs.isdisjoint(previous.output_keys)
+                }
+            )
+        return dependencies
+
+    def _run_graph(self, executor, run_component, parameter_values, reports):
+        remaining = dict(enumerate(self._dependencies()))
+        done = set()
+        running = {}
+        while remaining or running:
+            ready = [i for i, deps in remaining.items() if deps <= done]
+            for i in ready:
+                del remaining[i]
+                _, component = self.named_components[i]
+                # Each component gets its own snapshot, since the shared
+                # dictionary is updated as other components finish
+                future = executor.submit(
+                    run_component,
+                    component,
+                    dict(parameter_values._data),
+                    self._component_cache(),
+                )
+                running[future] = i
+
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                i = running.pop(future)
+                self._add_parameters(
+                    parameter_values,
+                    reports,
+                    self.named_components[i],
+                    *future.result(),
+                )
+                done.add(i)
+
+    def _add_parameters(
+        self,
+        parameter_values,
+        reports,
+        named_component,
+        new_params,
+        keys_read,
+        profile=None,
+    ):
+        name, component = named_component
+        component._generate_report(new_params, profile)
+        reports[name] = component.report_
+        parameter_values._update(new_params)
+        _record_keys(component, new_params, keys_read)
+
+    def export_profile(self, filename, format="json"):
+        """
+        Export the profile of the last (profiled) run of the pipeline.
+
+        Parameters
+        ----------
+        filename : str
+            File to write the profile to
+        format : str, optional
+            One of "json" (the profile of each component), "chrome" (Chrome trace
+            event format, for chrome://tracing or Perfetto) or "speedscope" (for
+            https://www.speedscope.app). Default is "json".
+        """
+        if self.report_ is None or any(
+            "profile" not in report for report in self.report_.values()
+        ):
+            raise ValueError("Pipeline must be run with profile=True first")
+        profiles = {name: report["profile"] for name, report in self.report_.items()}
+        if format == "json":
+            data = profiles
+        elif format == "chrome":
+            data = bpp.profiling.chrome_trace(profiles)
+        elif format == "speedscope":
+            data = bpp.profiling.speedscope(profiles)
+        else:
+            raise ValueError(f"Unknown profile format '{format}'")
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=4)
+
+    def _component_cache(self):
+        if self.cache is None:
+            return None
+        return bpp.cache.ComponentCache(os.path.join(self.cache, "components"))
+
+    def _save_cache(self, parameter_values):
         cache = os.path.join(self.cache, "parameters.json")
         json.dump(self.report_, open(cache, "w"), indent=4)
+        bpp.storage.save_parameters(
+            parameter_values, os.path.join(self.cache, "parameters")
+        )
+
+    @staticmethod
+    def load(cache, mmap=True):
+        """
+        Load the parameter values saved by the last run of a pipeline with the
+        given cache directory, without running anything.
+
+        Parameters
+        ----------
+        cache : str
+            Cache directory of the pipeline
+        mmap : bool, optional
+            Whether to memory-map array data (e.g. interpolation tables) rather
+            than reading it into memory. Default is True.
+
+        Returns
+        -------
+        :class:`pybamm.ParameterValues`
+            The parameter values generated by the pipeline
+        """
+        parameter_values = bpp.storage.load_parameters(
+            os.path.join(cache, "parameters"), mmap=mmap
+        )
+        return pybamm.ParameterValues(parameter_values)
@@ -1,6 +1,6 @@
 import matplotlib.pyplot as plt
 import numpy as np
-import pybamm
+import battery_param_pipeline as bpp
 
 
 def open_circuit(parameter_values):
@@ -12,15 +12,8 @@ def open_circuit(parameter_values):
     y_100 = parameter_values["Minimum stoichiometry in positive electrode"]
     y_0 = parameter_values["Maximum stoichiometry in positive electrode"]
 
-    def U_n(x):
-        if not isinstance(x, float):
-            x = pybamm.Vector(x)
-        return parameter_values["Negative electrode OCP [V]"](x).evaluate()
-
-    def U_p(y):
-        if not isinstance(y, float):
-            y = pybamm.Vector(y)
-        return parameter_values["Positive electrode OCP [V]"](y).evaluate()
+    U_n = bpp.functions.compile_function(parameter_values["Negative electrode OCP [V]"])
+    U_p = bpp.functions.compile_function(parameter_values["Positive electrode OCP [V]"])
 
     # Create axes
     ax_x = ax
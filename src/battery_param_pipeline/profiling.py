@@ -0,0 +1,73 @@
+def chrome_trace(profiles):
+    """
+    Convert the profiles of pipeline components to the Chrome trace event format.
+
+    Parameters
+    ----------
+    profiles : dict
+        Profile of each component, by name, as recorded by
+        :meth:`battery_param_pipeline.Pipeline.run`
+    """
+    events = []
+    for name, profile in profiles.items():
+        events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": profile["start [s]"] * 1e6,
+                "dur": profile["wall time [s]"] * 1e6,
+                "pid": profile["process"],
+                "tid": profile["thread"],
+                "args": {
+                    "CPU time [s]": profile["CPU time [s]"],
+                    "peak memory increase [B]": profile["peak memory increase [B]"],
+                    **profile["counters"],
+                },
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def speedscope(profiles):
+    """
+    Convert the profiles of pipeline components to the speedscope file format, with
+    one evented profile per thread.
+
+    Parameters
+    ----------
+    profiles : dict
+        Profile of each component, by name, as recorded by
+        :meth:`battery_param_pipeline.Pipeline.run`
+    """
+    names = list(profiles)
+    end = max(
+        (p["start [s]"] + p["wall time [s]"] for p in profiles.values()), default=0
+    )
+    threads = {}
+    for frame, (name, profile) in enumerate(profiles.items()):
+        thread = threads.setdefault((profile["process"], profile["thread"]), [])
+        start = profile["start [s]"]
+        thread.append((start, frame, start + profile["wall time [s]"]))
+
+    speedscope_profiles = []
+    for (process, thread), intervals in threads.items():
+        events = []
+        for start, frame, stop in sorted(intervals):
+            events.append({"type": "O", "frame": frame, "at": start})
+            events.append({"type": "C", "frame": frame, "at": stop})
+        speedscope_profiles.append(
+            {
+                "type": "evented",
+                "name": f"process {process}, thread {thread}",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": end,
+                "events": events,
+            }
+        )
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": [{"name": name} for name in names]},
+        "profiles": speedscope_profiles,
+        "exporter": "battery_param_pipeline",
+    }
@@ -0,0 +1,215 @@
+import functools
+import importlib
+import inspect
+import json
+import numbers
+import os
+import pickle
+import shutil
+import textwrap
+import types
+import numpy as np
+from .cache import _global_names
+
+
+def save_parameters(parameter_values, directory):
+    """
+    Save parameter values losslessly, as a manifest (`manifest.json`) describing each
+    parameter, with array data in separate `.npy` files so that it can be
+    memory-mapped when loading.
+
+    Numbers are stored exactly, functions by reference (or by source code for
+    functions defined inside other functions), partial functions by their function
+    and arguments, and any other values are pickled.
+
+    Parameters
+    ----------
+    parameter_values : dict-like
+        Parameter values to save
+    directory : str
+        Directory to save the parameter values to. Any existing contents are
+        replaced.
+    """
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(os.path.join(directory, "data"))
+    encoder = _Encoder(directory)
+    manifest = {
+        "version": 1,
+        "parameters": {k: encoder.encode(v) for k, v in parameter_values.items()},
+    }
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=4)
+
+
+def load_parameters(directory, mmap=True):
+    """
+    Load parameter values saved with :func:`save_parameters`.
+
+    Parameters
+    ----------
+    directory : str
+        Directory the parameter values were saved to
+    mmap : bool, optional
+        Whether to memory-map array data rather than reading it into memory.
+        Default is True.
+
+    Returns
+    -------
+    dict
+        The parameter values
+    """
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    decoder = _Decoder(directory, mmap)
+    parameter_values = {}
+    for k, v in manifest["parameters"].items():
+        if v["kind"] == "unavailable":
+            raise ValueError(
+                "Parameter '{}' could not be saved: {}".format(k, v["reason"])
+            )
+        parameter_values[k] = decoder.decode(v)
+    return parameter_values
+
+
+class _Encoder:
+    def __init__(self, directory):
+        self.directory = directory
+        self._n_files = 0
+
+    def _new_file(self, extension):
+        filename = os.path.join("data", f"{self._n_files}.{extension}")
+        self._n_files += 1
+        return filename
+
+    def encode(self, value):
+        if value is None or isinstance(value, (bool, str)):
+            return {"kind": "value", "value": value}
+        elif isinstance(value, numbers.Integral):
+            return {"kind": "value", "value": int(value)}
+        elif isinstance(value, numbers.Real):
+            # json writes floats with repr, which round-trips exactly
+            return {"kind": "value", "value": float(value)}
+        elif isinstance(value, np.ndarray) and value.dtype != object:
+            filename = self._new_file("npy")
+            np.save(os.path.join(self.directory, filename), value)
+            return {"kind": "array", "file": filename}
+        elif isinstance(value, (list, tuple)):
+            return {
+                "kind": type(value).__name__,
+                "items": [self.encode(item) for item in value],
+            }
+        elif isinstance(value, dict) and all(isinstance(k, str) for k in value):
+            return {
+                "kind": "dict",
+                "items": {k: self.encode(v) for k, v in value.items()},
+            }
+        elif isinstance(value, functools.partial):
+            return {
+                "kind": "partial",
+                "function": self.encode(value.func),
+                "args": self.encode(value.args),
+                "keywords": self.encode(value.keywords),
+            }
+        elif isinstance(value, types.FunctionType):
+            if "<locals>" not in value.__qualname__ and _importable(value):
+                return {
+                    "kind": "function",
+                    "module": value.__module__,
+                    "name": value.__qualname__,
+                }
+            encoded = _encode_source(value)
+            if encoded is not None:
+                return encoded
+        return self._encode_pickle(value)
+
+    def _encode_pickle(self, value):
+        try:
+            data = pickle.dumps(value)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            return {"kind": "unavailable", "reason": str(e)}
+        filename = self._new_file("pkl")
+        with open(os.path.join(self.directory, filename), "wb") as f:
+            f.write(data)
+        return {"kind": "pickle", "file": filename}
+
+
+def _importable(function):
+    try:
+        module = importlib.import_module(function.__module__)
+    except ImportError:
+        return False
+    return getattr(module, function.__qualname__, None) is function
+
+
+def _encode_source(function):
+    # Functions defined inside other functions (e.g. OCPs in the parameter sets) can
+    # be stored by source code, as long as they do not capture any variables and
+    # the only globals they use are modules. Lambdas cannot, as their source is the
+    # whole statement they are defined in.
+    if function.__closure__ or function.__name__ == "<lambda>":
+        return None
+    try:
+        source = textwrap.dedent(inspect.getsource(function))
+    except (OSError, TypeError):
+        return None
+    modules = {}
+    for name in _global_names(function.__code__):
+        if name in function.__globals__:
+            value = function.__globals__[name]
+            if not isinstance(value, types.ModuleType):
+                return None
+            modules[name] = value.__name__
+    return {
+        "kind": "source",
+        "name": function.__name__,
+        "source": source,
+        "modules": modules,
+    }
+
+
+class _Decoder:
+    def __init__(self, directory, mmap):
+        self.directory = directory
+        self.mmap = mmap
+
+    def decode(self, encoded):
+        kind = encoded["kind"]
+        if kind == "value":
+            return encoded["value"]
+        elif kind == "array":
+            return np.load(
+                os.path.join(self.directory, encoded["file"]),
+                mmap_mode="r" if self.mmap else None,
+            )
+        elif kind in ["list", "tuple"]:
+            items = [self.decode(item) for item in encoded["items"]]
+            return items if kind == "list" else tuple(items)
+        elif kind == "dict":
+            return {k: self.decode(v) for k, v in encoded["items"].items()}
+        elif kind == "partial":
+            return functools.partial(
+                self.decode(encoded["function"]),
+                *self.decode(encoded["args"]),
+                **self.decode(encoded["keywords"]),
+            )
+        elif kind == "function":
+            value = importlib.import_module(encoded["module"])
+            for name in encoded["name"].split("."):
+                value = getattr(value, name)
+            return value
+        elif kind == "source":
+            namespace = {
+                name: importlib.import_module(module)
+                for name, module in encoded["modules"].items()
+            }
+            exec(encoded["source"], namespace)
+            return namespace[encoded["name"]]
+        elif kind == "pickle":
+            with open(os.path.join(self.directory, encoded["file"]), "rb") as f:
+                return pickle.load(f)
+        elif kind == "unavailable":
+            raise ValueError(
+                "Parameter could not be saved: {}".format(encoded["reason"])
+            )
+        raise ValueError(f"Unknown kind of stored parameter '{kind}'")
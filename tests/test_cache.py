@@ -0,0 +1,163 @@
+import battery_param_pipeline as bpp
+import functools
+import importlib
+import numpy as np
+import pickle
+import pybamm
+import sys
+import textwrap
+
+
+class _Counted(bpp.calculations.Calculation):
+    def __init__(self, factor):
+        super().__init__("Scaled a")
+        self.factor = factor
+        self.n_runs_ = 0
+
+    def run(self, parameter_values):
+        self.n_runs_ += 1
+        return {"b": self.factor * parameter_values["a"]}
+
+
+def _f(x, scale):
+    return scale * x
+
+
+def test_fingerprint():
+    fingerprint = bpp.cache.fingerprint
+    assert fingerprint({"a": 1.0, "b": 2}) == fingerprint({"b": 2, "a": 1.0})
+    assert fingerprint(1.0) != fingerprint(1)
+    assert fingerprint(np.ones(3)) == fingerprint(np.ones(3))
+    assert fingerprint(np.ones(3)) != fingerprint(np.ones(4))
+    assert fingerprint(functools.partial(_f, scale=2)) == fingerprint(
+        functools.partial(_f, scale=2)
+    )
+    assert fingerprint(functools.partial(_f, scale=2)) != fingerprint(
+        functools.partial(_f, scale=3)
+    )
+    assert fingerprint(_Counted(2)) != fingerprint(_Counted(3))
+
+
+def test_pipeline_cache(tmp_path):
+    def make_pipeline(a, factor):
+        calculation = _Counted(factor)
+        pipeline = bpp.Pipeline(
+            [
+                ("a", bpp.direct_entries.DirectEntry({"a": a}, "a")),
+                ("b", calculation),
+            ],
+            cache=str(tmp_path),
+        )
+        return pipeline, calculation
+
+    pipeline, calculation = make_pipeline(1, 2)
+    assert pipeline.run()["b"] == 2
+    assert calculation.n_runs_ == 1
+
+    # unchanged inputs and arguments: loaded from the cache
+    pipeline, calculation = make_pipeline(1, 2)
+    assert pipeline.run()["b"] == 2
+    assert calculation.n_runs_ == 0
+    assert calculation.input_keys == ["a"]
+
+    # changed input or argument: rerun
+    for a, factor in [(2, 2), (1, 3)]:
+        pipeline, calculation = make_pipeline(a, factor)
+        assert pipeline.run()["b"] == a * factor
+        assert calculation.n_runs_ == 1
+
+
+def test_fingerprint_interpolants():
+    x = np.linspace(0, 1, 3)
+    child = pybamm.Scalar(0.5)
+    assert bpp.cache.fingerprint(
+        pybamm.Interpolant(x, x, child, name="f")
+    ) != bpp.cache.fingerprint(pybamm.Interpolant(x, 2 * x, child, name="f"))
+
+
+_COMPONENTS = """
+import battery_param_pipeline as bpp
+import _cache_helpers
+
+OFFSET = {offset}
+
+
+def shifted(x):
+    return x + OFFSET
+
+
+class Scaled(bpp.calculations.Calculation):
+    def __init__(self):
+        super().__init__("Scaled a")
+
+    def run(self, parameter_values):
+        a = parameter_values["a"]
+        return {{"b": _cache_helpers.scale(a), "c": parameter_values["f"](a)}}
+"""
+
+
+def test_pipeline_cache_globals(tmp_path, monkeypatch):
+    # module-level helpers of components, and globals of function parameters, are
+    # part of the cache keys
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # rewritten within the same second, so never load stale bytecode
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+
+    def run(factor, offset):
+        (tmp_path / "_cache_helpers.py").write_text(
+            f"def scale(x):\n    return {factor} * x\n"
+        )
+        (tmp_path / "_cache_components.py").write_text(
+            textwrap.dedent(_COMPONENTS.format(offset=offset))
+        )
+        importlib.invalidate_caches()
+        for name in ["_cache_helpers", "_cache_components"]:
+            if name in sys.modules:
+                importlib.reload(sys.modules[name])
+        components = importlib.import_module("_cache_components")
+        pipeline = bpp.Pipeline(
+            [
+                (
+                    "a",
+                    bpp.direct_entries.DirectEntry(
+                        {"a": 1.0, "f": components.shifted}, "a"
+                    ),
+                ),
+                ("b", components.Scaled()),
+            ],
+            cache=str(tmp_path / "cache"),
+        )
+        parameter_values = pipeline.run()
+        return parameter_values["b"], parameter_values["c"]
+
+    try:
+        assert run(2, 1) == (2.0, 2.0)
+        assert run(3, 100) == (3.0, 101.0)
+    finally:
+        for name in ["_cache_helpers", "_cache_components"]:
+            sys.modules.pop(name, None)
+
+
+def test_shared_array(tmp_path):
+    array = np.arange(10000.0).reshape(100, 100)
+    shared = bpp.cache.shared_array(array, str(tmp_path))
+    np.testing.assert_array_equal(shared, array)
+    assert not shared.flags.writeable
+
+    # equal arrays are stored once
+    assert bpp.cache.shared_array(array.copy(), str(tmp_path)).filename == (
+        shared.filename
+    )
+    assert len(list(tmp_path.glob("array-*.npy"))) == 1
+
+    # pickled as a reference to the file, which is mapped again when unpickled
+    data = pickle.dumps(shared)
+    assert len(data) < 1000
+    unpickled = pickle.loads(data)
+    assert unpickled.filename == shared.filename
+    np.testing.assert_array_equal(unpickled, array)
+
+    # derived arrays are pickled with their content
+    np.testing.assert_array_equal(
+        pickle.loads(pickle.dumps(2 * shared[:10])), 2 * array[:10]
+    )
@@ -0,0 +1,196 @@
+import battery_param_pipeline as bpp
+import numpy as np
+import pybamm
+import pytest
+
+
+def negative_ocp(sto):
+    return (
+        1.9793 * pybamm.exp(-39.3631 * sto)
+        + 0.2482
+        - 0.0909 * pybamm.tanh(29.8538 * (sto - 0.1234))
+        - 0.04478 * pybamm.tanh(14.9159 * (sto - 0.2769))
+        - 0.0205 * pybamm.tanh(30.4444 * (sto - 0.6103))
+    )
+
+
+def positive_ocp(sto):
+    return (
+        -0.8090 * sto
+        + 4.4875
+        - 0.0428 * pybamm.tanh(18.5138 * (sto - 0.5542))
+        - 17.7326 * pybamm.tanh(15.7890 * (sto - 0.3117))
+        + 17.5842 * pybamm.tanh(15.9308 * (sto - 0.3120))
+    )
+
+
+def _U(ocp, sto):
+    return ocp(pybamm.Scalar(sto)).evaluate()
+
+
+def _esoh_parameter_values(x_100, y_100, C, Cn=5.0, Cp=5.5):
+    # voltage cut-offs consistent with the given stoichiometries and capacity
+    V_max = _U(positive_ocp, y_100) - _U(negative_ocp, x_100)
+    V_min = _U(positive_ocp, y_100 + C / Cp) - _U(negative_ocp, x_100 - C / Cn)
+    return {
+        "Negative electrode OCP [V]": negative_ocp,
+        "Positive electrode OCP [V]": positive_ocp,
+        "Nominal cell capacity [A.h]": C,
+        "Negative electrode capacity [A.h]": Cn,
+        "Positive electrode capacity [A.h]": Cp,
+        "Lower voltage cut-off [V]": V_min,
+        "Upper voltage cut-off [V]": V_max,
+        "Maximum concentration in negative electrode [mol.m-3]": 1.0,
+        "Maximum concentration in positive electrode [mol.m-3]": 1.0,
+    }
+
+
+def test_electrode_soh():
+    esoh = bpp.calculations.ElectrodeSOH()
+    parameter_values = _esoh_parameter_values(0.85, 0.1, 4.0)
+    result = esoh.run(bpp.pipeline._ReadOnlyDict(parameter_values))
+    c_n = result["Initial concentration in negative electrode [mol.m-3]"]
+    c_p = result["Initial concentration in positive electrode [mol.m-3]"]
+    np.testing.assert_allclose([c_n, c_p], [0.85, 0.1], rtol=1e-6)
+
+    # warm start from the previous solution
+    parameter_values["Nominal cell capacity [A.h]"] = 4.0 + 1e-9
+    result = esoh.run(bpp.pipeline._ReadOnlyDict(parameter_values))
+    c_n = result["Initial concentration in negative electrode [mol.m-3]"]
+    np.testing.assert_allclose(c_n, 0.85, rtol=1e-6)
+
+
+def test_electrode_soh_tabulated_ocps():
+    # OCPs in pybamm's tabulated form
+    parameter_values = _esoh_parameter_values(0.85, 0.1, 4.0)
+    sto = np.linspace(0, 1, 2001)
+    for key, ocp in [
+        ("Negative electrode OCP [V]", negative_ocp),
+        ("Positive electrode OCP [V]", positive_ocp),
+    ]:
+        U = bpp.functions.compile_function(ocp)(sto)
+        parameter_values[key] = (key, (sto, U))
+    result = bpp.calculations.ElectrodeSOH().run(
+        bpp.pipeline._ReadOnlyDict(parameter_values)
+    )
+    c_n = result["Initial concentration in negative electrode [mol.m-3]"]
+    c_p = result["Initial concentration in positive electrode [mol.m-3]"]
+    np.testing.assert_allclose([c_n, c_p], [0.85, 0.1], rtol=1e-3)
+
+
+def test_electrode_soh_warm_start():
+    # the root moves far outside the narrow bracket around the previous solution
+    esoh = bpp.calculations.ElectrodeSOH()
+    parameter_values = _esoh_parameter_values(0.85, 0.1, 4.0)
+    esoh.run(bpp.pipeline._ReadOnlyDict(parameter_values))
+    parameter_values["Nominal cell capacity [A.h]"] = 3.0
+    warm = esoh.run(bpp.pipeline._ReadOnlyDict(parameter_values))
+    cold = bpp.calculations.ElectrodeSOH().run(
+        bpp.pipeline._ReadOnlyDict(parameter_values)
+    )
+    for key, value in cold.items():
+        np.testing.assert_allclose(warm[key], value, rtol=1e-6)
+
+    # same when the pipeline branches for several variants
+    pipeline = bpp.Pipeline(
+        [
+            ("entry", bpp.direct_entries.DirectEntry(parameter_values, "entry")),
+            ("esoh", bpp.calculations.ElectrodeSOH()),
+        ]
+    )
+    _, variants = pipeline.run_many(
+        [{"Nominal cell capacity [A.h]": C} for C in [3.0, 3.5]]
+    )
+    key = "Initial concentration in negative electrode [mol.m-3]"
+    np.testing.assert_allclose(variants[0][key], cold[key], rtol=1e-6)
+
+
+def test_electrode_soh_infeasible():
+    # the positive electrode cannot hold the nominal capacity within [0, 1]
+    parameter_values = _esoh_parameter_values(0.85, 0.1, 4.0)
+    parameter_values.update(
+        {
+            "Nominal cell capacity [A.h]": 3.35,
+            "Negative electrode capacity [A.h]": 4.0,
+            "Positive electrode capacity [A.h]": 4.2,
+            "Lower voltage cut-off [V]": 2.5,
+            "Upper voltage cut-off [V]": 4.2,
+        }
+    )
+    with pytest.raises(ValueError, match="Could not find electrode stoichiometries"):
+        bpp.calculations.ElectrodeSOH().run(
+            bpp.pipeline._ReadOnlyDict(parameter_values)
+        )
+
+    # no sign change anywhere
+    root = bpp.calculations.capacity._bracketed_root(
+        lambda x: x + 1, np.zeros(2), np.ones(2)
+    )
+    assert np.isnan(root).all()
+
+
+def test_electrode_soh_batched():
+    x_100 = np.array([0.8, 0.85, 0.9])
+    y_100 = np.array([0.12, 0.1, 0.08])
+    C = np.array([3.5, 4.0, 4.2])
+    parameter_values = {}
+    for i in range(3):
+        for k, v in _esoh_parameter_values(x_100[i], y_100[i], C[i]).items():
+            parameter_values.setdefault(k, []).append(v)
+    parameter_values = {
+        k: v[0] if callable(v[0]) or k.startswith("Max") else np.array(v)
+        for k, v in parameter_values.items()
+    }
+    result = bpp.calculations.ElectrodeSOH().run(
+        bpp.pipeline._ReadOnlyDict(parameter_values)
+    )
+    np.testing.assert_allclose(
+        result["Initial concentration in negative electrode [mol.m-3]"],
+        x_100,
+        rtol=1e-6,
+    )
+    np.testing.assert_allclose(
+        result["Initial concentration in positive electrode [mol.m-3]"],
+        y_100,
+        rtol=1e-6,
+    )
+
+
+def test_initial_soc():
+    parameter_values = {
+        "Maximum stoichiometry in negative electrode": 0.9,
+        "Minimum stoichiometry in negative electrode": 0.1,
+        "Minimum stoichiometry in positive electrode": 0.2,
+        "Maximum stoichiometry in positive electrode": 0.8,
+        "Maximum concentration in negative electrode [mol.m-3]": 10.0,
+        "Maximum concentration in positive electrode [mol.m-3]": 20.0,
+        "Initial SOC": np.array([0, 0.5, 1]),
+    }
+    pipeline = bpp.Pipeline(
+        [
+            ("entry", bpp.direct_entries.DirectEntry(parameter_values, "entry")),
+            ("initial soc", bpp.calculations.InitialSOC()),
+        ]
+    )
+    result = pipeline.run()
+    np.testing.assert_array_equal(result["Initial SOC"], [0, 0.5, 1])
+    np.testing.assert_allclose(
+        result["Initial concentration in negative electrode [mol.m-3]"],
+        [1.0, 5.0, 9.0],
+    )
+    np.testing.assert_allclose(
+        result["Initial concentration in positive electrode [mol.m-3]"],
+        [16.0, 10.0, 4.0],
+    )
+    # one set of parameter values per SOC
+    split = bpp.pipeline.split_batch(result)
+    assert [p["Initial SOC"] for p in split] == [0, 0.5, 1]
+    assert [
+        p["Initial concentration in negative electrode [mol.m-3]"] for p in split
+    ] == [1.0, 5.0, 9.0]
+
+    parameter_values["Initial SOC"] = 0.5
+    result = bpp.calculations.InitialSOC().run(
+        bpp.pipeline._ReadOnlyDict(parameter_values)
+    )
+    assert result["Initial concentration in negative electrode [mol.m-3]"] == 5.0
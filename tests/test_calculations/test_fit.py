@@ -0,0 +1,88 @@
+import battery_param_pipeline as bpp
+import numpy as np
+import pytest
+import scipy.optimize
+
+
+class _Wavy(bpp.calculations.Fit):
+    # least-squares cost with many local minima, and its global minimum at x = 3
+    def __init__(self, **kwargs):
+        super().__init__("Wavy fit", **kwargs)
+
+    def initial_guess(self, parameter_values):
+        return [parameter_values["Initial guess"]]
+
+    def residuals(self, x, parameter_values):
+        return [x[0] - 3, 2 * np.sin(5 * (x[0] - 3))]
+
+    def outputs(self, x, parameter_values):
+        return {"Fitted": x[0]}
+
+
+class _NeverConverges(_Wavy):
+    def local_fit(self, x0, bounds, args):
+        return scipy.optimize.OptimizeResult(x=x0, success=False, cost=0, nfev=1)
+
+
+class _Independent(_Wavy):
+    # two independent elements, each converging only from starts above 1
+    def initial_guess(self, parameter_values):
+        return [parameter_values["Initial guess"]] * 2
+
+    def local_fit(self, x0, bounds, args):
+        return scipy.optimize.OptimizeResult(
+            x=x0, success=x0 > 1, cost=(x0 - 3) ** 2, nfev=1
+        )
+
+    def outputs(self, x, parameter_values):
+        return {"Fitted": x}
+
+
+def test_fit():
+    parameter_values = bpp.pipeline._ReadOnlyDict({"Initial guess": 0.5})
+    single = _Wavy()
+    single.run(parameter_values)
+    assert single.convergence_["starts"] == 1
+
+    multi = _Wavy(n_starts=16)
+    result = multi.run(parameter_values)
+    assert result["Fitted"] == pytest.approx(3)
+    assert multi.convergence_["converged"] == 16
+    assert multi.convergence_["best cost"] < single.convergence_["best cost"]
+
+    multi._generate_report(result)
+    assert multi.report_["convergence"] == multi.convergence_
+
+    # same result in a process pool
+    parallel = _Wavy(n_starts=16, n_workers=2)
+    assert parallel.run(parameter_values) == result
+
+
+def test_fit_not_converged():
+    parameter_values = bpp.pipeline._ReadOnlyDict({"Initial guess": 0.5})
+    with pytest.raises(ValueError, match="did not converge from any of the 4"):
+        _NeverConverges(n_starts=4).run(parameter_values)
+
+
+def test_fit_independent_elements():
+    parameter_values = bpp.pipeline._ReadOnlyDict({"Initial guess": 0.5})
+    fit = _Independent(n_starts=16)
+    result = fit.run(parameter_values)
+
+    # best converged start for each element, even from starts where the other
+    # element did not converge
+    starts = np.array(fit.starting_points(np.array([0.5, 0.5]), (-np.inf, np.inf)))
+    cost = np.where(starts > 1, (starts - 3) ** 2, np.inf)
+    np.testing.assert_array_equal(
+        result["Fitted"], starts[np.argmin(cost, axis=0), [0, 1]]
+    )
+    assert fit.convergence_["converged"] < (starts > 1).any(axis=1).sum()
+    assert fit.convergence_["best cost"] == pytest.approx(cost.min(axis=0).sum())
+
+
+def test_fit_zero_initial_guess():
+    parameter_values = bpp.pipeline._ReadOnlyDict({"Initial guess": 0.0})
+    # fine with a single start, but all the other starts would be the same
+    _Wavy().run(parameter_values)
+    with pytest.raises(ValueError, match="initial guess of 0"):
+        _Wavy(n_starts=4).run(parameter_values)
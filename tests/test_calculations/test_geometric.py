@@ -0,0 +1,39 @@
+import battery_param_pipeline as bpp
+import numpy as np
+
+
+def _run(calculation, parameter_values):
+    return calculation.run(bpp.pipeline._ReadOnlyDict(parameter_values))
+
+
+def test_batched_geometric_calculations():
+    n = 5
+    parameter_values = {
+        "Electrode area [m2]": np.linspace(0.1, 0.2, n),
+        "Negative electrode thickness [m]": np.linspace(50e-6, 100e-6, n),
+        "Positive electrode thickness [m]": 80e-6,
+        "Maximum concentration in negative electrode [mol.m-3]": 30000,
+        "Maximum concentration in positive electrode [mol.m-3]": 50000,
+        "Negative electrode loading [A.h.cm-2]": np.linspace(3e-3, 4e-3, n),
+        "Positive electrode loading [A.h.cm-2]": 3.5e-3,
+        "Negative particle radius [m]": 5e-6,
+        "Positive particle radius [m]": 3e-6,
+    }
+    batched = dict(parameter_values)
+    for calculation in [
+        bpp.calculations.AreaToSquareWidthHeight(),
+        bpp.calculations.ElectrodeVolumeFractionFromLoading(),
+        bpp.calculations.SurfaceArea(),
+    ]:
+        batched.update(_run(calculation, batched))
+
+    for i in range(n):
+        scalar = {k: v[i] if np.ndim(v) else v for k, v in parameter_values.items()}
+        for calculation in [
+            bpp.calculations.AreaToSquareWidthHeight(),
+            bpp.calculations.ElectrodeVolumeFractionFromLoading(),
+            bpp.calculations.SurfaceArea(),
+        ]:
+            scalar.update(_run(calculation, scalar))
+        for k, v in scalar.items():
+            np.testing.assert_allclose(np.broadcast_to(batched[k], n)[i], v)
@@ -0,0 +1,46 @@
+import battery_param_pipeline as bpp
+import numpy as np
+import pybamm
+import pytest
+
+
+def _decay_model():
+    model = pybamm.BaseModel()
+    x = pybamm.Variable("x")
+    k = pybamm.Parameter("Rate constant [s-1]")
+    model.rhs = {x: -k * x}
+    model.initial_conditions = {x: pybamm.Parameter("Initial value")}
+    model.variables = {"Decay rate": k * x}
+    return model
+
+
+def test_target_model_output():
+    parameter_values = bpp.pipeline._ReadOnlyDict({"Initial value": 2.0})
+    fit = bpp.calculations.TargetModelOutput(
+        _decay_model(),
+        "Rate constant [s-1]",
+        "Decay rate",
+        target=np.array([1.0, 3.0, 5.0]),
+    )
+    fit._counters = {}
+    result = fit.run(parameter_values)
+    np.testing.assert_allclose(result["Rate constant [s-1]"], [0.5, 1.5, 2.5])
+
+    # the compiled model is reused
+    fit._target = 4.0
+    assert fit.run(parameter_values)["Rate constant [s-1]"] == 2.0
+    assert fit._counters["model compilations"] == 1
+
+
+def test_target_model_output_multi_start():
+    parameter_values = bpp.pipeline._ReadOnlyDict({"Initial value": 2.0})
+    fit = bpp.calculations.TargetModelOutput(
+        _decay_model(),
+        "Rate constant [s-1]",
+        "Decay rate",
+        target=4.0,
+        n_starts=4,
+        n_workers=2,
+    )
+    assert fit.run(parameter_values)["Rate constant [s-1]"] == pytest.approx(2.0)
+    assert fit.convergence_["converged"] == 4
@@ -0,0 +1,66 @@
+import battery_param_pipeline as bpp
+import numpy as np
+import pybamm
+import pytest
+
+
+def negative_ocp(sto):
+    return 0.1 + 1.5 * pybamm.exp(-20 * sto) - 0.05 * sto
+
+
+def positive_ocp(sto):
+    return 4.3 - 1.2 * sto**2 - 0.2 * pybamm.tanh(5 * (sto - 0.5))
+
+
+def _U(ocp, sto):
+    return ocp(pybamm.Scalar(sto)).evaluate()
+
+
+def test_ocp_balance():
+    x_100 = np.array([0.8, 0.85, 0.9])
+    y_100 = np.array([0.12, 0.1, 0.08])
+    C, Cn, Cp = np.array([3.5, 4.0, 4.2]), 5.0, 5.5
+    V_max = [_U(positive_ocp, y) - _U(negative_ocp, x) for x, y in zip(x_100, y_100)]
+    V_min = [
+        _U(positive_ocp, y + c / Cp) - _U(negative_ocp, x - c / Cn)
+        for x, y, c in zip(x_100, y_100, C)
+    ]
+    parameter_values = bpp.pipeline._ReadOnlyDict(
+        {
+            "Negative electrode OCP [V]": negative_ocp,
+            "Positive electrode OCP [V]": positive_ocp,
+            "Nominal cell capacity [A.h]": C,
+            "Negative electrode capacity [A.h]": Cn,
+            "Positive electrode capacity [A.h]": Cp,
+            "Lower voltage cut-off [V]": np.array(V_min),
+            "Upper voltage cut-off [V]": np.array(V_max),
+        }
+    )
+    balance = bpp.calculations.OCPBalance()
+    result = balance.run(parameter_values)
+    for key, expected in [
+        ("Maximum stoichiometry in negative electrode", x_100),
+        ("Minimum stoichiometry in negative electrode", x_100 - C / Cn),
+        ("Minimum stoichiometry in positive electrode", y_100),
+        ("Maximum stoichiometry in positive electrode", y_100 + C / Cp),
+    ]:
+        np.testing.assert_allclose(result[key], expected, atol=1e-4)
+    # the tables are reused
+    assert len(balance.tables_) == 2
+
+
+def test_ocp_balance_infeasible():
+    # y_0 would be above 1 for the lower voltage cut-off to be reached
+    parameter_values = bpp.pipeline._ReadOnlyDict(
+        {
+            "Negative electrode OCP [V]": negative_ocp,
+            "Positive electrode OCP [V]": positive_ocp,
+            "Nominal cell capacity [A.h]": 4.5,
+            "Negative electrode capacity [A.h]": 5.0,
+            "Positive electrode capacity [A.h]": 5.0,
+            "Lower voltage cut-off [V]": 2.0,
+            "Upper voltage cut-off [V]": 4.2,
+        }
+    )
+    with pytest.raises(ValueError, match="Could not find electrode stoichiometries"):
+        bpp.calculations.OCPBalance().run(parameter_values)
@@ -0,0 +1,94 @@
+import battery_param_pipeline as bpp
+import numpy as np
+import pandas as pd
+import pybamm
+import pytest
+from functools import partial
+
+# Coefficients of the graphite OCP of the LGMJ1 example
+GRAPHITE = [
+    0.2482,
+    0,
+    1.9793,
+    39.3631,
+    -0.0909,
+    -0.04478,
+    -0.0205,
+    29.8538,
+    14.9159,
+    30.4444,
+    0.1234,
+    0.2769,
+    0.6103,
+]
+
+
+def _graphite_data(n_points=300, noise=1e-4, seed=0):
+    rng = np.random.default_rng(seed)
+    sto = np.linspace(0.01, 0.99, n_points)
+    U = bpp.functions.compile_function(partial(bpp.data_fits.ocp._tanh_ocp, GRAPHITE))
+    voltage = U(sto)
+    return sto, voltage + noise * rng.standard_normal(n_points)
+
+
+def test_fit_ocp_curves():
+    sto, voltage = _graphite_data()
+    initial = np.array(GRAPHITE) * 1.05
+    coefficients, rms_error, converged = bpp.data_fits.fit_ocp_curves(
+        [sto, sto[::2]], [voltage, voltage[::2]], initial_coefficients=initial
+    )
+    assert coefficients.shape == (2, 13)
+    assert converged.all()
+    np.testing.assert_array_less(rms_error, 2e-4)
+
+    # random starts, without the exponential term
+    coefficients, rms_error, _ = bpp.data_fits.fit_ocp_curves(
+        [sto], [voltage], exponential=False, n_starts=4
+    )
+    assert coefficients[0, 2] == 0
+    assert rms_error[0] < 0.05
+
+
+def test_fit_ocp_curves_non_finite():
+    # a start whose exponential overflows is abandoned, not converged
+    sto, voltage = _graphite_data()
+    initial = np.array(GRAPHITE)
+    initial[3] = -1e4
+    _, rms_error, converged = bpp.data_fits.fit_ocp_curves(
+        [sto], [voltage], initial_coefficients=initial
+    )
+    assert not np.isfinite(rms_error[0])
+    assert not converged[0]
+
+
+def test_ocp_fit():
+    sto, voltage = _graphite_data()
+    data = pd.DataFrame(
+        {
+            "Stoichiometry": np.concatenate([sto, sto]),
+            "Voltage [V]": np.concatenate([voltage, voltage + 0.1]),
+            "Electrode": ["negative"] * len(sto) + ["shifted"] * len(sto),
+        }
+    )
+    fit = bpp.data_fits.OCPFit(
+        data,
+        {
+            "negative": "Negative electrode OCP [V]",
+            "shifted": "Shifted OCP [V]",
+        },
+        curve_column="Electrode",
+        initial_coefficients=GRAPHITE,
+    )
+    assert fit.output_keys == ["Negative electrode OCP [V]", "Shifted OCP [V]"]
+    parameter_values = bpp.Pipeline([("ocp", fit)]).run()
+    assert fit.report_["fit"]["Shifted OCP [V]"]["RMS error [V]"] < 2e-4
+
+    U_n = parameter_values["Negative electrode OCP [V]"]
+    assert isinstance(U_n(pybamm.Scalar(0.5)), pybamm.Symbol)
+    U = bpp.functions.compile_function(parameter_values["Shifted OCP [V]"])
+    np.testing.assert_allclose(U(sto), voltage + 0.1, atol=1e-3)
+
+    with pytest.raises(ValueError, match="No data for curve 'positive'"):
+        bpp.data_fits.OCPFit(
+            data, {"positive": "Positive electrode OCP [V]"}, curve_column="Electrode"
+        )
@@ -0,0 +1,151 @@
+import importlib
+import numpy as np
+import pandas as pd
+import pickle
+import pybamm
+import pytest
+from scipy.interpolate import interp1d
+
+# the module, which the function of the same name hides in `direct_entries`
+aem = importlib.import_module(
+    "battery_param_pipeline.direct_entries.advanced_electrolyte_model"
+)
+advanced_electrolyte_model = aem.advanced_electrolyte_model
+
+
+def _aem_data(seed=0):
+    # unsorted data, with a different number of concentrations at each temperature
+    rng = np.random.default_rng(seed)
+    rows = []
+    for T, n in [(-10, 5), (25, 8), (40, 3)]:
+        c = rng.uniform(0.1, 2.5, n)
+        rows.append(
+            pd.DataFrame(
+                {
+                    "Temperature(C)": T,
+                    "c": c,
+                    "Cond (mS) 2": 10 * c * np.exp(-c) * (1 + T / 100),
+                    "t+(a)": 0.4 - 0.05 * c**2,
+                    "Diff. Coeff. cm^2/s": 3e-6 * np.exp(-0.5 * c),
+                    "Unused": rng.random(n),
+                }
+            )
+        )
+    return pd.concat(rows).sample(frac=1, random_state=seed)
+
+
+def test_get_2d_mesh_data():
+    data = _aem_data()
+    parameters = ["Cond (mS) 2", "t+(a)", "Diff. Coeff. cm^2/s"]
+    cs_interp = np.linspace(0, 3, 50)
+    cs, Ts, data_interp = aem._get_2d_mesh_data(data, parameters, cs_interp)
+    np.testing.assert_array_equal(Ts, [-10, 25, 40])
+    assert data_interp.shape == (50, 3, 3)
+
+    # same as interpolating each temperature and parameter separately
+    for i, T in enumerate(Ts):
+        subdata = data[data["Temperature(C)"] == T]
+        for j, parameter in enumerate(parameters):
+            expected = interp1d(
+                subdata["c"], subdata[parameter], fill_value="extrapolate"
+            )(cs_interp)
+            np.testing.assert_allclose(data_interp[:, i, j], expected, rtol=1e-10)
+
+    with pytest.raises(ValueError, match="at least two concentrations"):
+        aem._get_2d_mesh_data(data.iloc[:1], parameters, cs_interp)
+
+
+def test_mesh_builder_chunks():
+    data = _aem_data(seed=1)
+    parameters = ["Cond (mS) 2", "t+(a)", "Diff. Coeff. cm^2/s"]
+    cs_interp = np.linspace(0, 3, 50)
+    expected = aem._get_2d_mesh_data(data, parameters, cs_interp)
+
+    # same tables when the rows come a few at a time
+    builder = aem._MeshBuilder(parameters, cs_interp)
+    for start in range(0, len(data), 3):
+        builder.add(data.iloc[start : start + 3])
+    for expected_array, actual_array in zip(expected, builder.mesh()):
+        np.testing.assert_allclose(actual_array, expected_array, rtol=1e-12)
+
+
+def test_read_aem_csv_chunksize(tmp_path):
+    filename = str(tmp_path / "aem.csv")
+    _aem_data().to_csv(filename, index=False)
+    expected = aem._read_aem_csv(filename, chunksize=10**6)
+    for expected_array, actual_array in zip(
+        expected, aem._read_aem_csv(filename, chunksize=2)
+    ):
+        np.testing.assert_allclose(actual_array, expected_array, rtol=1e-12)
+
+
+def test_advanced_electrolyte_model_cache(tmp_path, monkeypatch):
+    filename = str(tmp_path / "aem.csv")
+    _aem_data().to_csv(filename, index=False)
+    cache = str(tmp_path / "cache")
+    entry = advanced_electrolyte_model(filename, cache=cache)
+    assert len(list((tmp_path / "cache").glob("aem-*.npz"))) == 1
+
+    # reloading the same file does not parse it
+    def read_csv(*args, **kwargs):
+        raise AssertionError("CSV parsed again")
+
+    monkeypatch.setattr(aem.pd, "read_csv", read_csv)
+    cached = advanced_electrolyte_model(filename, cache=cache)
+    parameter = "Electrolyte conductivity [S.m-1]"
+    for expected, actual in zip(
+        entry.run({})[parameter].args, cached.run({})[parameter].args
+    ):
+        np.testing.assert_array_equal(expected, actual)
+
+
+def test_advanced_electrolyte_model_shared_tables(tmp_path):
+    filename = str(tmp_path / "aem.csv")
+    _aem_data().to_csv(filename, index=False)
+    parameters = advanced_electrolyte_model(filename).run({})
+    shared = advanced_electrolyte_model(filename, cache=str(tmp_path / "cache")).run({})
+
+    # the tables are pickled as references to files in the cache
+    assert len(pickle.dumps(shared)) < len(pickle.dumps(parameters)) / 10
+    unpickled = pickle.loads(pickle.dumps(shared))
+    c, T = pybamm.Scalar(1000), pybamm.Scalar(298.15)
+    for name, function in parameters.items():
+        if callable(function):
+            assert all(arg.filename is not None for arg in unpickled[name].args)
+            np.testing.assert_allclose(
+                unpickled[name](c, T).evaluate(), function(c, T).evaluate()
+            )
+
+
+def test_adaptive_knots():
+    cs = np.linspace(0, 3, 1000)
+    data = np.column_stack([np.exp(-cs), 2 * np.exp(-cs)])
+    knots = aem._adaptive_knots(cs, data, 1e-3)
+    assert knots[0] == 0 and knots[-1] == 999
+    assert len(knots) < 50
+    error = np.abs(np.interp(cs, cs[knots], data[knots, 1]) - data[:, 1])
+    assert error.max() <= 2e-3
+
+    # linear data only needs the end points
+    np.testing.assert_array_equal(
+        aem._adaptive_knots(cs, np.column_stack([cs]), 1e-6), [0, 999]
+    )
+
+
+def test_advanced_electrolyte_model_rtol(tmp_path):
+    filename = str(tmp_path / "aem.csv")
+    _aem_data().to_csv(filename, index=False)
+    parameter = "Electrolyte conductivity [S.m-1]"
+    uniform = advanced_electrolyte_model(filename).run({})
+    adaptive = advanced_electrolyte_model(filename, rtol={parameter: 1e-3}).run({})
+    cs = adaptive[parameter].args[0]
+    assert len(cs) < len(uniform[parameter].args[0])
+    c, T = pybamm.Scalar(1000), pybamm.Scalar(298.15)
+    np.testing.assert_allclose(
+        adaptive[parameter](c, T).evaluate(),
+        uniform[parameter](c, T).evaluate(),
+        rtol=2e-3,
+    )
+    # other properties are unchanged
+    diffusivity = "Electrolyte diffusivity [m2.s-1]"
+    assert len(adaptive[diffusivity].args[0]) == 1000
@@ -0,0 +1,40 @@
+import battery_param_pipeline as bpp
+import numpy as np
+import pybamm
+
+
+def ocp(sto):
+    return 4.2 - 0.5 * pybamm.tanh(10 * (sto - 0.5))
+
+
+def conductivity(c_e, T):
+    return 1e-3 * c_e * pybamm.exp(-1000 / T)
+
+
+def test_compile_function():
+    U = bpp.functions.compile_function(ocp)
+    sto = np.linspace(0, 1, 11)
+    np.testing.assert_allclose(U(sto), 4.2 - 0.5 * np.tanh(10 * (sto - 0.5)))
+    assert np.ndim(U(0.5)) == 0
+    assert U(np.ones((2, 3))).shape == (2, 3)
+    # memoized by function object
+    assert bpp.functions.compile_function(ocp) is U
+
+    kappa = bpp.functions.compile_function(conductivity)
+    c_e = np.array([500.0, 1000.0])
+    np.testing.assert_allclose(kappa(c_e, 298.15), 1e-3 * c_e * np.exp(-1000 / 298.15))
+
+
+def test_compile_constant_function():
+    def entropic_change(sto):
+        return 0
+
+    np.testing.assert_array_equal(
+        bpp.functions.compile_function(entropic_change)(np.ones(3)), 0
+    )
+
+
+def test_compile_tabulated_function():
+    sto = np.linspace(0, 1, 11)
+    U = bpp.functions.compile_function(("ocp", (sto, 4 - sto)))
+    np.testing.assert_allclose(U([0.25, 0.5]), [3.75, 3.5])
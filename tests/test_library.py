@@ -0,0 +1,54 @@
+import battery_param_pipeline as bpp
+import numpy as np
+import pickle
+import pybamm
+import pytest
+import scipy.stats
+
+
+def test_parameter_library(tmp_path):
+    def ocp(sto):
+        return 4.2 - 0.5 * pybamm.tanh(sto)
+
+    library = bpp.library.ParameterLibrary(str(tmp_path / "library"))
+    library.add(
+        "cell a",
+        bpp.direct_entries.DirectEntry(
+            {
+                "Capacity [A.h]": scipy.stats.norm(5, 0.1),
+                "OCP [V]": ocp,
+                "Table": np.linspace(0, 1, 5),
+            },
+            "Cell A datasheet",
+        ),
+    )
+    library.add("cell b", {"Capacity [A.h]": 3.0})
+    assert library.names() == ["cell a", "cell b"]
+    assert len(library) == 2
+    assert "cell b" in library and "cell c" not in library
+    assert library.load("cell b") == {"Capacity [A.h]": 3.0}
+
+    # the parameter names come from the index, and the values are only loaded when
+    # the entry is run
+    entry = library.entry("cell a")
+    assert entry.source == "Cell A datasheet"
+    assert entry.output_keys == ["Capacity [A.h]", "OCP [V]", "Table"]
+    assert entry._parameters._values is None
+    parameter_values = entry.run({})
+    assert parameter_values["Capacity [A.h]"] == pytest.approx(5)
+    assert isinstance(parameter_values["Table"], np.memmap)
+    assert parameter_values["OCP [V]"](0.5).evaluate() == ocp(0.5).evaluate()
+    assert entry.sample(10)["Capacity [A.h]"].shape == (10,)
+
+    # only the location of the set is pickled
+    unpickled = pickle.loads(pickle.dumps(entry))
+    assert unpickled._parameters._values is None
+    np.testing.assert_array_equal(unpickled.run({})["Table"], np.linspace(0, 1, 5))
+
+    # replacing a set
+    library.add("cell b", {"Capacity [A.h]": 4.0}, source="Cell B datasheet")
+    assert len(library) == 2
+    assert library.entry("cell b").run({}) == {"Capacity [A.h]": 4.0}
+
+    with pytest.raises(ValueError, match="No parameter set 'cell c'"):
+        library.entry("cell c")
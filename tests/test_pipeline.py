@@ -1,5 +1,44 @@
+import asyncio
 import battery_param_pipeline as bpp
+import concurrent.futures
+import numpy as np
 import pytest
+import scipy.stats
+
+
+class _Sum(bpp.calculations.Calculation):
+    def __init__(self):
+        super().__init__("Sum of a and b")
+
+    def run(self, parameter_values):
+        self.count("additions")
+        return {"c": parameter_values["a"] + parameter_values["b"]}
+
+
+class _Difference(bpp.calculations.Calculation):
+    def __init__(self):
+        super().__init__("Difference of c and a")
+
+    def run(self, parameter_values):
+        # equal to b, up to rounding errors
+        return {"d": parameter_values["c"] - parameter_values["a"]}
+
+
+class _AsyncEntry(bpp.direct_entries.DirectEntry):
+    async def run(self, parameter_values):
+        await asyncio.sleep(0)
+        return dict(self._parameters)
+
+
+def _example_pipeline():
+    return bpp.Pipeline(
+        [
+            ("a", bpp.direct_entries.DirectEntry({"a": 1}, "a")),
+            ("b", bpp.direct_entries.DirectEntry({"b": 2}, "b")),
+            ("sum", _Sum()),
+            ("d", bpp.direct_entries.DirectEntry({"d": 4}, "d")),
+        ]
+    )
 
 
 def test_pipeline_element():
@@ -18,8 +57,238 @@ def test_read_only_dict():
         read_only_dict["c"] = 3
 
 
+def test_read_only_dict_to_pybamm():
+    read_only_dict = bpp.pipeline._ReadOnlyDict({})
+    read_only_dict._update({"a": 1})
+    parameter_values = read_only_dict.to_pybamm()
+    assert parameter_values["a"] == 1
+    read_only_dict._update({"b": 2})
+    assert read_only_dict.version == 2
+    # the same object is brought up to date
+    assert read_only_dict.to_pybamm() is parameter_values
+    assert parameter_values["b"] == 2
+    # updates are applied to a copy
+    updated = read_only_dict.to_pybamm({"a": 3})
+    assert updated["a"] == 3
+    assert parameter_values["a"] == 1
+    with pytest.raises(ValueError, match="already exists"):
+        read_only_dict._update({"a": 4})
+
+
+def test_recording_dict():
+    recording_dict = bpp.pipeline._RecordingDict({"a": 1, "b": 2})
+    assert recording_dict["a"] == 1
+    assert recording_dict.keys_read == {"a"}
+    assert not recording_dict.read_all
+    dict(recording_dict)
+    assert recording_dict.read_all
+
+
 class TestPipeline:
     def test_pipeline(self):
         pipeline = bpp.pipeline.Pipeline([])
         assert pipeline.cache is None
         assert pipeline.report_ is None
+
+    def test_duplicate_keys(self):
+        pipeline = bpp.Pipeline(
+            [
+                ("a", bpp.direct_entries.DirectEntry({"a": 1}, "a")),
+                ("a again", bpp.direct_entries.DirectEntry({"a": 2}, "a")),
+            ]
+        )
+        with pytest.raises(ValueError, match="already exists"):
+            pipeline.run()
+
+    def test_dependencies(self):
+        pipeline = _example_pipeline()
+        # before the first run, the calculation depends on everything before it
+        # and everything after it depends on the calculation
+        assert pipeline._dependencies() == [set(), set(), {0, 1}, {2}]
+        pipeline.run()
+        assert pipeline.named_components[2][1].input_keys == ["a", "b"]
+        assert pipeline._dependencies() == [set(), set(), {0, 1}, set()]
+
+    def test_run_parallel(self):
+        pipeline = _example_pipeline()
+        parameter_values = pipeline.run()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            parallel_parameter_values = pipeline.run(executor=executor)
+        assert dict(parallel_parameter_values) == dict(parameter_values)
+        assert parallel_parameter_values["c"] == 3
+        assert list(pipeline.report_) == ["a", "b", "sum", "d"]
+
+    def test_run_batched(self):
+        pipeline = bpp.Pipeline(
+            [
+                ("a", bpp.direct_entries.DirectEntry({"a": np.arange(3.0)}, "a")),
+                ("b", bpp.direct_entries.DirectEntry({"b": 2.0}, "b")),
+                ("sum", _Sum()),
+            ]
+        )
+        parameter_values = pipeline.run()
+        np.testing.assert_array_equal(parameter_values["c"], [2.0, 3.0, 4.0])
+        assert pipeline.report_["sum"]["parameters"]["c"] == "[2. 3. 4.]"
+
+    def test_arun(self):
+        pipeline = _example_pipeline()
+        pipeline.named_components[1] = ("b", _AsyncEntry({"b": 2}, "b"))
+        parameter_values = asyncio.run(pipeline.arun())
+        assert parameter_values["c"] == 3
+        assert list(pipeline.report_) == ["a", "b", "sum", "d"]
+
+    def test_run_many(self):
+        pipeline = _example_pipeline()
+        calls = []
+        component = pipeline.named_components[2][1]
+        run = component.run
+
+        def counted_run(parameter_values):
+            calls.append(parameter_values["b"])
+            return run(parameter_values)
+
+        component.run = counted_run
+        variants = [{"b": 2}, {"b": 5}, {"b": 5, "d": 0}]
+        table, parameter_values = pipeline.run_many(variants)
+        # the calculation only runs once per distinct value of "b"
+        assert calls == [2, 5]
+        assert list(table["c"]) == [3, 6, 6]
+        assert list(table["d"]) == [4, 4, 0]
+        assert [p["c"] for p in parameter_values] == [3, 6, 6]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            table_parallel, _ = pipeline.run_many(variants, executor=executor)
+        assert table_parallel.equals(table)
+
+    def test_run_many_unknown_parameter(self):
+        pipeline = _example_pipeline()
+        with pytest.raises(ValueError, match="not generated by any component"):
+            pipeline.run_many([{"e": 1}])
+
+    def test_run_lazy(self):
+        pipeline = _example_pipeline()
+        sum_calculation = pipeline.named_components[2][1]
+        sum_calculation.output_keys = ["c"]
+        lazy = pipeline.run_lazy()
+        assert not hasattr(sum_calculation, "report_")
+        assert lazy["d"] == 4
+        assert not hasattr(sum_calculation, "report_")
+        assert lazy["c"] == 3
+        assert sum_calculation.input_keys == ["a", "b"]
+        with pytest.raises(KeyError):
+            lazy["e"]
+        assert dict(lazy) == {"a": 1, "b": 2, "c": 3, "d": 4}
+
+    def test_run_profile(self, tmp_path):
+        pipeline = _example_pipeline()
+        pipeline.run(profile=True)
+        profile = pipeline.report_["sum"]["profile"]
+        assert profile["wall time [s]"] >= 0
+        assert profile["counters"] == {"additions": 1}
+        for format in ["json", "chrome", "speedscope"]:
+            filename = str(tmp_path / f"profile_{format}.json")
+            pipeline.export_profile(filename, format=format)
+        with pytest.raises(ValueError, match="Unknown profile format"):
+            pipeline.export_profile(filename, format="csv")
+
+        pipeline.run()
+        with pytest.raises(ValueError, match="profile=True"):
+            pipeline.export_profile(filename)
+
+    def test_run_monte_carlo(self):
+        pipeline = bpp.Pipeline(
+            [
+                (
+                    "a",
+                    bpp.direct_entries.DirectEntry(
+                        {"a": scipy.stats.norm(1, 0.1)}, "a"
+                    ),
+                ),
+                ("b", bpp.direct_entries.DirectEntry({"b": 2}, "b")),
+                ("sum", _Sum()),
+                ("difference", _Difference()),
+            ]
+        )
+        assert pipeline.run()["c"] == 3
+        summary, correlation, parameter_values = pipeline.run_monte_carlo(10000, seed=0)
+        assert list(summary.index) == ["a", "c", "d"]
+        # d does not depend on a, so it is left out of the correlations
+        assert 0 < summary.loc["d", "std"] < 1e-12
+        assert list(correlation.index) == ["a", "c"]
+        assert summary.loc["c", "mean"] == pytest.approx(3, abs=0.01)
+        assert summary.loc["c", "std"] == pytest.approx(0.1, abs=0.01)
+        assert summary.loc["c", "2.5%"] == pytest.approx(3 - 0.196, abs=0.01)
+        assert correlation.loc["a", "c"] == pytest.approx(1)
+        assert parameter_values["c"].shape == (10000,)
+        assert parameter_values["b"] == 2
+
+    def test_sensitivities(self):
+        area = 0.04
+        pipeline = bpp.Pipeline(
+            [
+                (
+                    "entries",
+                    bpp.direct_entries.DirectEntry(
+                        {"Electrode area [m2]": area, "a": 1, "b": 2}, "entries"
+                    ),
+                ),
+                ("sum", _Sum()),
+                ("area", bpp.calculations.AreaToSquareWidthHeight()),
+            ]
+        )
+        jacobian = pipeline.sensitivities()
+        assert list(jacobian.columns) == ["Electrode area [m2]", "a", "b"]
+        np.testing.assert_allclose(jacobian.loc["c"], [0, 1, 1])
+        np.testing.assert_allclose(
+            jacobian.loc["Electrode height [m]"], [0.5 / np.sqrt(area), 0, 0]
+        )
+
+        jacobian = pipeline.sensitivities(inputs=["a"])
+        assert jacobian.shape == (3, 1)
+        with pytest.raises(ValueError, match="not a scalar direct entry"):
+            pipeline.sensitivities(inputs=["c"])
+
+    def test_compile(self):
+        pipeline = _example_pipeline()
+        f = pipeline.compile(inputs=["a"], outputs=["c", "b"])
+        assert f(10) == (12, 2)
+        c, _ = f(np.array([1.0, 2.0]))
+        np.testing.assert_array_equal(c, [3, 4])
+
+        # outputs that do not depend on the inputs are not recalculated
+        f = pipeline.compile(inputs=["d"], outputs=["c"])
+        _, component = pipeline.named_components[2]
+        component._counters = {}
+        assert f(5) == (3,)
+        assert component._counters == {}
+
+        with pytest.raises(ValueError, match="not a direct entry"):
+            pipeline.compile(inputs=["c"], outputs=["c"])
+        with pytest.raises(ValueError, match="not generated by any component"):
+            pipeline.compile(inputs=["a"], outputs=["e"])
+
+
+def test_split_batch():
+    parameter_values = {"a": np.array([1.0, 2.0]), "b": 3.0}
+    assert bpp.pipeline.batch_size(parameter_values) == 2
+    assert bpp.pipeline.batch_size({"b": 3.0}) is None
+    split = bpp.pipeline.split_batch(parameter_values)
+    assert [p["a"] for p in split] == [1.0, 2.0]
+    assert [p["b"] for p in split] == [3.0, 3.0]
+    with pytest.raises(ValueError, match="Inconsistent batch sizes"):
+        bpp.pipeline.batch_size({"a": np.ones(2), "b": np.ones(3)})
+
+    # arrays of different lengths are fine until the parameters are split
+    pipeline = bpp.Pipeline(
+        [
+            (
+                "tables",
+                bpp.direct_entries.DirectEntry(
+                    {"a": np.ones(2), "b": np.ones(3)}, "Tables"
+                ),
+            )
+        ]
+    )
+    parameter_values = pipeline.run()
+    with pytest.raises(ValueError, match="Inconsistent batch sizes"):
+        bpp.pipeline.split_batch(parameter_values)
@@ -0,0 +1,61 @@
+import battery_param_pipeline as bpp
+import functools
+import numpy as np
+import pybamm
+import pytest
+
+
+def _scale(x, factor):
+    return factor * x
+
+
+def test_save_load_parameters(tmp_path):
+    def ocp(sto):
+        return 4.2 - 0.5 * pybamm.tanh(sto)
+
+    def closure(sto):
+        return ocp(sto)
+
+    parameter_values = {
+        "float": 0.1 + 0.2,
+        "int": 3,
+        "string": "a",
+        "array": np.linspace(0, 1, 7),
+        "function": _scale,
+        "local function": ocp,
+        "partial": functools.partial(_scale, factor=np.arange(3.0)),
+    }
+    directory = str(tmp_path / "parameters")
+    bpp.storage.save_parameters(parameter_values, directory)
+    loaded = bpp.storage.load_parameters(directory)
+
+    assert loaded["float"] == parameter_values["float"]
+    assert loaded["int"] == 3
+    assert loaded["string"] == "a"
+    assert isinstance(loaded["array"], np.memmap)
+    np.testing.assert_array_equal(loaded["array"], parameter_values["array"])
+    assert loaded["function"] is _scale
+    assert loaded["local function"](0.5).evaluate() == ocp(0.5).evaluate()
+    np.testing.assert_array_equal(loaded["partial"](2), [0.0, 2.0, 4.0])
+
+    bpp.storage.save_parameters({"closure": closure}, directory)
+    with pytest.raises(ValueError, match="'closure' could not be saved"):
+        bpp.storage.load_parameters(directory)
+
+
+def test_save_lambda(tmp_path):
+    # a lambda is not stored by source (which would be the whole statement)
+    directory = str(tmp_path / "parameters")
+    bpp.storage.save_parameters({"a": 1.0, "lambda": lambda x: 2 * x}, directory)
+    with pytest.raises(ValueError, match="'lambda' could not be saved"):
+        bpp.storage.load_parameters(directory)
+
+
+def test_pipeline_load(tmp_path):
+    pipeline = bpp.Pipeline(
+        [("a", bpp.direct_entries.DirectEntry({"a": 1 / 3}, "a"))],
+        cache=str(tmp_path),
+    )
+    parameter_values = pipeline.run()
+    loaded = bpp.Pipeline.load(str(tmp_path))
+    assert loaded["a"] == parameter_values["a"]